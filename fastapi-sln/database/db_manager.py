@@ -1,13 +1,248 @@
+import base64
+import html
+import itertools
 import sqlite3
-from typing import List, Optional
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 from models.task import Task
+from database.migrations import MIGRATIONS, REBUILD_TASK_STATS
+from database.rows import TASK_COLUMNS, TASK_SELECT, TaskRow
 import json
+# Sort keys accepted by list_tasks -> SQL expression; id is always the keyset tie-breaker
+SORT_EXPRESSIONS = {
+    "created_at": "created_at",
+    "due_date": "due_date",
+    "title": "title",
+    "priority": "priority_rank",    # high 3, medium 2, low 1 (migration 8)
+}
+class ChangeLogExpired(Exception):
+    """The requested ?since= predates pruned change-log entries: the client must resync from 0."""
+def encode_cursor(sort_value: Any, task_id: str) -> str:
+    raw = json.dumps([sort_value, task_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, task_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    return sort_value, task_id
+def _keyset_condition(expr: str, descending: bool, value: Any, task_id: str) -> List[Tuple[str, list]]:
+    # Rows strictly after (value, id) in ORDER BY expr, id, as one or two arms to UNION ALL.
+    # SQLite sorts NULLs first ascending and last descending, so a cursor on the other side of
+    # the NULLs needs a second arm. Each arm is one range of the (user_id, expr, id) index: row
+    # values seek there, where an OR would scan from the start of the user's tasks.
+    if not descending:
+        if value is None:
+            return [(f"{expr} IS NULL AND id > ?", [task_id]), (f"{expr} IS NOT NULL", [])]
+        return [(f"({expr}, id) > (?, ?)", [value, task_id])]
+    if value is None:
+        return [(f"{expr} IS NULL AND id < ?", [task_id])]
+    return [(f"({expr}, id) < (?, ?)", [value, task_id]), (f"{expr} IS NULL", [])]
+# A tag filter drives the query from the rarest tag's postings when it has at most this
+# many tasks (sorting them is cheap); otherwise it walks the ordered index and probes task_tags.
+TAG_DRIVE_LIMIT = 5000
+TAG_POSTINGS = "SELECT COUNT(*) FROM (SELECT 1 FROM task_tags WHERE user_id = ? AND tag = ? LIMIT ?)"
+TAG_PROBE = "EXISTS (SELECT 1 FROM task_tags WHERE user_id = ? AND tag = ? AND task_id = tasks.id)"
+# Bound parameters per IN (...) list, well under SQLITE_MAX_VARIABLE_NUMBER
+IN_CHUNK = 500
+GET_TASKS = f"SELECT {TASK_SELECT} FROM tasks WHERE user_id = ?"
+EXISTING_IDS = "SELECT id FROM tasks WHERE user_id = ? AND id IN ({placeholders})"
+MARK_COMPLETED = "UPDATE tasks SET completed = TRUE WHERE id = ? AND user_id = ?"
+TAG_FACETS = """
+    SELECT tag, COUNT(*) AS n FROM task_tags WHERE user_id = ?
+    GROUP BY tag ORDER BY n DESC, tag
+"""
+TAG_FACETS_BY_STATUS = """
+    SELECT task_tags.tag, COUNT(*) AS n FROM task_tags
+    JOIN tasks ON tasks.id = task_tags.task_id
+    WHERE task_tags.user_id = ? AND tasks.completed = ?
+    GROUP BY task_tags.tag ORDER BY n DESC, task_tags.tag
+"""
+CHANGE_SEQ = "SELECT seq FROM task_change_seq WHERE user_id = ?"
+CHANGE_HORIZON = "SELECT pruned_seq FROM task_change_seq WHERE user_id = ?"
+# Up to ? tombstones logged before ? (UTC text, like changed_at), oldest first (migration 10)
+PRUNE_TOMBSTONES = """
+    DELETE FROM task_changes WHERE (user_id, seq) IN (
+        SELECT user_id, seq FROM task_changes
+        WHERE op = 'delete' AND changed_at < ?
+        ORDER BY changed_at
+        LIMIT ?
+    )
+    RETURNING user_id, seq
+"""
+RAISE_CHANGE_HORIZON = "UPDATE task_change_seq SET pruned_seq = MAX(pruned_seq, ?) WHERE user_id = ?"
+USER_STATS = """
+    SELECT dimension, value, total, completed, points, earned_points
+    FROM task_stats WHERE user_id = ? AND total > 0
+"""
+# Overdue depends on the clock, so it is counted from the (user_id, completed, due_date) index
+OVERDUE_COUNT = "SELECT COUNT(*) FROM tasks WHERE user_id = ? AND completed = ? AND due_date < ?"
+# AuthService's user lookups
+USER_CREDENTIALS = "SELECT id, password_hash FROM users WHERE username = ?"
+USER_BY_ID = "SELECT id, username, created_at FROM users WHERE id = ?"
+def _task_params(task: Task) -> tuple:
+    return (
+        task.id, task.title, task.description, task.priority.value,
+        task.due_date, json.dumps(task.tags), task.category,
+        task.completed, task.user_id, task.recurrence.value,
+        task.parent_task_id, task.points
+    )
+INSERT_TASK = """
+    INSERT INTO tasks (
+        id, title, description, priority, due_date, tags,
+        category, completed, user_id, recurrence, parent_task_id, points
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+# A task and all of its descendants; UNION (not UNION ALL) makes a parent cycle terminate
+TASK_SUBTREE = """
+    WITH RECURSIVE subtree(id) AS (
+        SELECT id FROM tasks WHERE id = ? AND user_id = ?
+        UNION
+        SELECT t.id FROM tasks t JOIN subtree ON t.parent_task_id = subtree.id
+        WHERE t.user_id = ?
+    )
+"""
+# Every step of subtree is already scoped to the user, so the DELETE goes straight to the primary key
+DELETE_SUBTREE = TASK_SUBTREE + "DELETE FROM tasks WHERE id IN (SELECT id FROM subtree)"
+# Tree load with a depth column so the walk stops at max_depth
+TASK_TREE = """
+    WITH RECURSIVE tree({columns}, depth) AS (
+        SELECT {columns}, 0 FROM tasks WHERE id = ? AND user_id = ?
+        UNION ALL
+        SELECT {child_columns}, tree.depth + 1 FROM tasks t JOIN tree ON t.parent_task_id = tree.id
+        WHERE t.user_id = ? AND tree.depth < ?
+    )
+    SELECT {columns}, depth FROM tree
+""".format(columns=TASK_SELECT, child_columns=", ".join(f"t.{column}" for column in TASK_COLUMNS))
+def search_match(user_id: str, query: str) -> str:
+    # Free text -> FTS5 MATCH expression. Every word is quoted, so user input can't inject
+    # query syntax; all words must match, in title or description. Whole words only: a prefix
+    # query merges the postings of every matching term and can't skip to the user's documents.
+    words = ['"{}"'.format(word.replace('"', '""')) for word in query.split()
+             if any(char.isalnum() for char in word)]
+    if not words:
+        raise ValueError("Search query has no words")
+    user = user_id.replace('"', '""')
+    return f'user_id : "{user}" AND {{title description}} : ({" ".join(words)})'
+def highlight_html(marked: Optional[str]) -> Optional[str]:
+    # highlight()/snippet() return the stored text verbatim, matches wrapped in \x02...\x03:
+    # escape the text first, then turn the markers into <mark>, so the result is safe HTML.
+    if marked is None:
+        return None
+    return html.escape(marked).replace("\x02", "<mark>").replace("\x03", "</mark>")
+# Ranked by bm25 (the rank configured in migration 4): highlighted title, description snippet, score.
+# FTS5 sorts by rank itself, so highlight/snippet only run for the rows returned.
+SEARCH_TASKS = """
+    SELECT {columns},
+           highlight(tasks_fts, 0, char(2), char(3)),
+           snippet(tasks_fts, 1, char(2), char(3), '…', 16),
+           rank
+    FROM tasks_fts JOIN tasks t ON t.rowid = tasks_fts.rowid
+    WHERE tasks_fts MATCH ? AND t.user_id = ?
+    ORDER BY rank
+    LIMIT ? OFFSET ?
+""".format(columns=", ".join(f"t.{column}" for column in TASK_COLUMNS))
+# Latest change per task after a seq, oldest first, joined to the task's current state
+# (no task row: it was deleted). One statement, so log and tasks come from one snapshot.
+# Walks the log from the seq on its primary key and stops after LIMIT rows; a row superseded
+# by a newer change of the same task is skipped with one idx_task_changes_task probe.
+CHANGES_SINCE = """
+    SELECT change.seq, change.task_id, {columns}
+    FROM task_changes AS change
+    LEFT JOIN tasks t ON t.id = change.task_id AND t.user_id = change.user_id
+    WHERE change.user_id = ? AND change.seq > ?
+        AND NOT EXISTS (
+            SELECT 1 FROM task_changes AS newer
+            WHERE newer.user_id = change.user_id AND newer.task_id = change.task_id
+                AND newer.seq > change.seq)
+    ORDER BY change.seq
+    LIMIT ?
+""".format(columns=", ".join(f"t.{column}" for column in TASK_COLUMNS))
+# Recurring series heads (see migration 6) with the head task's columns, for RecurrenceScheduler
+RECURRENCE_HEADS = """
+    SELECT r.series_id, r.anchor_due, r.occurrence, {columns}
+    FROM task_recurrences r JOIN tasks t ON t.id = r.task_id
+""".format(columns=", ".join(f"t.{column}" for column in TASK_COLUMNS))
+UNSCHEDULED_RECURRENCE_HEADS = RECURRENCE_HEADS + "WHERE r.next_due IS NULL LIMIT ?"
+DUE_RECURRENCE_HEADS = RECURRENCE_HEADS + "WHERE r.next_due <= ? ORDER BY r.next_due LIMIT ?"
+UPSERT_RECURRENCE = """
+    INSERT INTO task_recurrences (task_id, user_id, series_id, anchor_due, occurrence, next_due)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (task_id) DO UPDATE SET series_id = excluded.series_id, anchor_due = excluded.anchor_due,
+        occurrence = excluded.occurrence, next_due = excluded.next_due
+"""
+# Statements on the request paths with placeholder parameters, checked with EXPLAIN QUERY PLAN
+# by unindexed_queries. Built from the constants the methods execute, so they can't drift;
+# hot_queries() adds the list_tasks statements that _task_query builds.
+HOT_QUERIES = {
+    "get_tasks": (GET_TASKS, ("",)),
+    "existing_ids": (EXISTING_IDS.format(placeholders="?"), ("", "")),
+    "mark_completed": (MARK_COMPLETED, ("", "")),
+    "delete_task_tree": (DELETE_SUBTREE, ("", "", "")),
+    "task_tree": (TASK_TREE, ("", "", "", 10)),
+    "tag_postings": (TAG_POSTINGS, ("", "", TAG_DRIVE_LIMIT + 1)),
+    "tag_facets": (TAG_FACETS, ("",)),
+    "tag_facets_by_status": (TAG_FACETS_BY_STATUS, ("", False)),
+    "search_tasks": (SEARCH_TASKS, (search_match("", "x"), "", 20, 0)),
+    "change_seq": (CHANGE_SEQ, ("",)),
+    "changes_since": (CHANGES_SINCE, ("", 0, 500)),
+    "change_horizon": (CHANGE_HORIZON, ("",)),
+    "prune_tombstones": (PRUNE_TOMBSTONES, ("", 10000)),
+    "unscheduled_recurrences": (UNSCHEDULED_RECURRENCE_HEADS, (1000,)),
+    "due_recurrences": (DUE_RECURRENCE_HEADS, ("", 1000)),
+    "user_stats": (USER_STATS, ("",)),
+    "overdue_count": (OVERDUE_COUNT, ("", False, "")),
+    "user_credentials": (USER_CREDENTIALS, ("",)),
+    "user_by_id": (USER_BY_ID, ("",)),
+}
 class DatabaseManager:
-    def __init__(self, db_path: str = "todo.db"):
+    # Connections are kept per thread and reused: sqlite3.connect, the PRAGMAs and the
+    # prepared-statement cache are paid once per thread instead of once per query.
+    def __init__(self, db_path: str = "todo.db", cached_statements: int = 256,
+                 mmap_size: int = 256 * 1024 * 1024, busy_timeout: float = 30.0):
         self.db_path = db_path
+        self.cached_statements = cached_statements
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
         self._init_db()
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout,
+                               cached_statements=self.cached_statements,
+                               check_same_thread=False)
+        # WAL lets readers run concurrently with the single writer; NORMAL only fsyncs at checkpoints
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    @contextmanager
+    def connection(self):
+        # Yields this thread's pooled connection inside a transaction (commit on success, rollback on error)
+        conn = self._get_connection()
+        with conn:
+            yield conn
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS users (
@@ -17,7 +252,7 @@ class DatabaseManager:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
-            
+
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS tasks (
                     id TEXT PRIMARY KEY,
@@ -37,43 +272,315 @@ class DatabaseManager:
                     FOREIGN KEY (parent_task_id) REFERENCES tasks(id)
                 )
             """)
-            
-            conn.commit()
+        self._migrate()
+    def _migrate(self):
+        conn = self._get_connection()
+        for version, statements in MIGRATIONS:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                continue
+            with conn:
+                # IMMEDIATE takes the write lock, so concurrent processes apply each version once
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    continue
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+    def explain(self, sql: str, params: tuple = ()) -> List[str]:
+        with self.connection() as conn:
+            return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    def hot_queries(self) -> Dict[str, Tuple[str, Sequence[Any]]]:
+        # HOT_QUERIES plus list_tasks as _task_query builds it: every sort and direction, first and
+        # later pages (cursor values on both sides of the NULLs), a status filter and a tag filter
+        queries = dict(HOT_QUERIES)
+        cursors = {"first": None, "after": encode_cursor("", ""), "after_null": encode_cursor(None, "")}
+        with self.connection() as conn:
+            for sort, descending, page in itertools.product(SORT_EXPRESSIONS, (False, True), cursors):
+                sql, params = self._task_query(conn, "", sort=sort, descending=descending, cursor=cursors[page])
+                name = f"list_tasks:{sort}:{'desc' if descending else 'asc'}:{page}"
+                queries[name] = (f"{sql} LIMIT ?", [*params, 100])
+            sql, params = self._task_query(conn, "", completed=False, sort="due_date")
+            queries["list_tasks:open_by_due"] = (f"{sql} LIMIT ?", [*params, 100])
+            sql, params = self._task_query(conn, "", tags=["x"])
+            queries["list_tasks:tagged"] = (f"{sql} LIMIT ?", [*params, 100])
+        return queries
+    def unindexed_queries(self) -> Dict[str, List[str]]:
+        # Hot queries whose plan contains a full table scan; empty when every one uses an index.
+        # Scans of CTEs (e.g. the recursive subtree walk) are not table scans, and a virtual
+        # table "scan" (the FTS5 MATCH) is answered from the full-text index.
+        with self.connection() as conn:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        offenders = {}
+        for name, (sql, params) in self.hot_queries().items():
+            plan = self.explain(sql, params)
+            if any(step.startswith("SCAN") and "USING" not in step and "VIRTUAL TABLE" not in step
+                   and step.split()[1] in tables
+                   for step in plan):
+                offenders[name] = plan
+        return offenders
     def add_task(self, task: Task) -> bool:
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO tasks (
-                    id, title, description, priority, due_date, tags,
-                    category, completed, user_id, recurrence, parent_task_id, points
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                task.id, task.title, task.description, task.priority.value,
-                task.due_date, json.dumps(task.tags), task.category,
-                task.completed, task.user_id, task.recurrence.value,
-                task.parent_task_id, task.points
-            ))
+            cursor.execute(INSERT_TASK, _task_params(task))
             return True
     def get_tasks(self, user_id: str) -> List[Task]:
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM tasks WHERE user_id = ?", (user_id,))
+            cursor.execute(GET_TASKS, (user_id,))
             return [self._row_to_task(row) for row in cursor.fetchall()]
+    def _task_query(self, conn: sqlite3.Connection, user_id: str, completed: Optional[bool] = None, priority: Optional[str] = None,
+                    category: Optional[str] = None, tags: Optional[Sequence[str]] = None,
+                    due_from: Optional[datetime] = None, due_to: Optional[datetime] = None,
+                    sort: str = "created_at", descending: bool = False,
+                    cursor: Optional[str] = None) -> Tuple[str, list]:
+        # Filtered, ordered task query shared by list_tasks and iter_tasks; the last column is the sort key
+        if sort not in SORT_EXPRESSIONS:
+            raise ValueError(f"Unsupported sort: {sort}")
+        expr = SORT_EXPRESSIONS[sort]
+        where = ["user_id = ?"]
+        params: list = [user_id]
+        if completed is not None:
+            where.append("completed = ?")
+            params.append(completed)
+        if priority is not None:
+            where.append("priority = ?")
+            params.append(priority)
+        if category is not None:
+            where.append("category = ?")
+            params.append(category)
+        if tags:
+            # All of the given tags, answered from task_tags; the planner's statistics can't see
+            # per-tag selectivity, so pick the access path from bounded posting counts
+            counts = {tag: conn.execute(TAG_POSTINGS, (user_id, tag, TAG_DRIVE_LIMIT + 1)).fetchone()[0]
+                      for tag in dict.fromkeys(tags)}
+            tags = sorted(counts, key=counts.get)
+            if counts[tags[0]] <= TAG_DRIVE_LIMIT:
+                # "+" keeps the user filter but stops it choosing the ordered user index
+                where[0] = "+user_id = ?"
+                where.append("id IN (SELECT task_id FROM task_tags WHERE user_id = ? AND tag = ?)")
+                params.extend([user_id, tags.pop(0)])
+            for tag in tags:
+                where.append(TAG_PROBE)
+                params.extend([user_id, tag])
+        if due_from is not None:
+            where.append("due_date >= ?")
+            params.append(due_from)
+        if due_to is not None:
+            where.append("due_date < ?")
+            params.append(due_to)
+        direction = "DESC" if descending else "ASC"
+        arms = _keyset_condition(expr, descending, *decode_cursor(cursor)) if cursor else [(None, [])]
+        selects = [f"SELECT {TASK_SELECT}, {expr} FROM tasks WHERE {' AND '.join(where + [c] if c else where)}"
+                   for c, _ in arms]
+        if len(arms) == 1:
+            sql = f"{selects[0]} ORDER BY {expr} {direction}, id {direction}"
+        else:
+            # Both arms are read in index order and merged, so LIMIT still stops early. A compound
+            # ORDER BY names result columns: id is the first, the sort key the last.
+            sql = f"{' UNION ALL '.join(selects)} ORDER BY {len(TASK_COLUMNS) + 1} {direction}, 1 {direction}"
+        return sql, [param for _, arm_params in arms for param in params + arm_params]
+    def list_tasks(self, user_id: str, limit: int = 100, cursor: Optional[str] = None,
+                   **filters) -> Tuple[List[Task], Optional[str]]:
+        # One keyset page: filters and ordering run in SQLite and only limit + 1 rows are read
+        with self.connection() as conn:
+            sql, params = self._task_query(conn, user_id, cursor=cursor, **filters)
+            rows = conn.execute(f"{sql} LIMIT ?", params + [limit + 1]).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][-1], rows[-1][0])
+        return [self._row_to_task(row) for row in rows], next_cursor
+    def tag_counts(self, user_id: str, completed: Optional[bool] = None) -> List[Tuple[str, int]]:
+        # Tag facets for one user, most used first
+        with self.connection() as conn:
+            if completed is None:
+                rows = conn.execute(TAG_FACETS, (user_id,))
+            else:
+                rows = conn.execute(TAG_FACETS_BY_STATUS, (user_id, completed))
+            return rows.fetchall()
+    def search_tasks(self, user_id: str, query: str, limit: int = 20,
+                     offset: int = 0) -> Tuple[List[Tuple[Task, str, Optional[str], float]], bool]:
+        # One page of (task, highlighted title, description snippet, score), best match first;
+        # the flag says whether another page follows. score is -bm25, so higher is better.
+        # Title and snippet are HTML-escaped, with matches wrapped in <mark>.
+        with self.connection() as conn:
+            rows = conn.execute(SEARCH_TASKS, (search_match(user_id, query), user_id,
+                                               limit + 1, offset)).fetchall()
+        hits = [(self._row_to_task(row), highlight_html(row[-3]), highlight_html(row[-2] or None), -row[-1])
+                for row in rows[:limit]]
+        return hits, len(rows) > limit
+    def change_seq(self, user_id: str) -> int:
+        # The user's latest change sequence (0 before any write); one primary key lookup
+        with self.connection() as conn:
+            row = conn.execute(CHANGE_SEQ, (user_id,)).fetchone()
+        return row[0] if row else 0
+    def changes_since(self, user_id: str, since: int, limit: int = 500
+                      ) -> Tuple[int, List[Tuple[int, str, Optional[Task]]], bool]:
+        # (seq to resume from, [(seq, task_id, current task or None if deleted)], more pending).
+        # A task changed several times since `since` appears once, at its latest seq.
+        # Raises ChangeLogExpired if a tombstone after `since` has been pruned: the log can then no
+        # longer bring a client from `since` up to date (a full sync reads the tasks instead).
+        with self.connection() as conn:
+            rows = conn.execute(CHANGES_SINCE, (user_id, since, limit + 1)).fetchall()
+            # Read after the page: a prune that removed a tombstone this page should have had
+            # committed before the page was read, so its raised horizon is visible here
+            horizon = conn.execute(CHANGE_HORIZON, (user_id,)).fetchone()
+        if horizon and since < horizon[0]:
+            raise ChangeLogExpired(f"Changes before seq {horizon[0]} are no longer kept; sync again from since=0")
+        more = len(rows) > limit
+        rows = rows[:limit]
+        changes = [(row[0], row[1], self._row_to_task(row[2:]) if row[2] is not None else None)
+                   for row in rows]
+        # Every seq has a log row, so the last row reached is the user's current seq unless more remain
+        return (rows[-1][0] if rows else since), changes, more
+    def prune_changes(self, before: datetime, limit: int = 10000) -> int:
+        # Drops up to `limit` tombstones logged before `before` (naive UTC, like changed_at) and
+        # raises each affected user's pruned_seq in the same transaction; returns how many
+        with self.connection() as conn:
+            pruned = conn.execute(PRUNE_TOMBSTONES, (before.strftime("%Y-%m-%d %H:%M:%S"), limit)).fetchall()
+            horizons: Dict[str, int] = {}
+            for user_id, seq in pruned:
+                horizons[user_id] = max(seq, horizons.get(user_id, 0))
+            conn.executemany(RAISE_CHANGE_HORIZON, [(seq, user_id) for user_id, seq in horizons.items()])
+        return len(pruned)
+    def task_stats(self, user_id: str, now: datetime) -> Tuple[List[tuple], int]:
+        # ([(dimension, value, total, completed, points, earned_points)], overdue count). The
+        # aggregates are read precomputed from task_stats; overdue is counted from the index,
+        # touching only the overdue entries.
+        with self.connection() as conn:
+            rows = conn.execute(USER_STATS, (user_id,)).fetchall()
+            overdue = conn.execute(OVERDUE_COUNT, (user_id, False, now)).fetchone()[0]
+        return rows, overdue
+    def rebuild_stats(self) -> int:
+        # Recomputes task_stats for every user in one pass over tasks; returns the number of users
+        with self.connection() as conn:
+            conn.execute("DELETE FROM task_stats")
+            conn.execute(REBUILD_TASK_STATS)
+            return conn.execute("SELECT COUNT(*) FROM task_stats WHERE dimension = 'all'").fetchone()[0]
+    def iter_tasks(self, user_id: str, batch_size: int = 500, **filters) -> Iterator[TaskRow]:
+        # Streams TaskRows batch by batch. The iterator may be advanced from different
+        # threadpool threads, so it reads on its own connection rather than a pooled one.
+        conn = self._connect()
+        try:
+            sql, params = self._task_query(conn, user_id, **filters)
+            cursor = conn.cursor()
+            cursor.row_factory = TaskRow.factory
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+    def recurrence_heads(self, horizon: datetime, limit: int = 1000) -> List[Tuple[Optional[str], Any, Optional[int], TaskRow]]:
+        # (series_id, anchor_due, occurrence, head task) for series not scheduled yet (NULLs),
+        # then for those with an occurrence due by horizon; both read through the next_due index
+        with self.connection() as conn:
+            rows = conn.execute(UNSCHEDULED_RECURRENCE_HEADS, (limit,)).fetchall()
+            if len(rows) < limit:
+                rows += conn.execute(DUE_RECURRENCE_HEADS, (horizon, limit - len(rows))).fetchall()
+        return [(row[0], row[1], row[2], TaskRow(row[3:])) for row in rows]
+    def apply_recurrences(self, occurrences: Sequence[Task], heads: Sequence[tuple],
+                          finished: Sequence[str]) -> int:
+        # One transaction: insert the new occurrences, drop the series heads they replace and
+        # upsert the new heads (task_id, user_id, series_id, anchor_due, occurrence, next_due).
+        # Occurrence ids are deterministic, so one that already exists is skipped, not duplicated.
+        # Returns the number of tasks actually inserted.
+        with self.connection() as conn:
+            cursor = conn.executemany(INSERT_TASK.replace("INSERT", "INSERT OR IGNORE", 1),
+                                      [_task_params(task) for task in occurrences])
+            inserted = max(cursor.rowcount, 0)
+            conn.executemany("DELETE FROM task_recurrences WHERE task_id = ?", [(task_id,) for task_id in finished])
+            conn.executemany(UPSERT_RECURRENCE, heads)
+        return inserted
+    def mark_completed(self, task_id: str, user_id: str) -> bool:
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(MARK_COMPLETED, (task_id, user_id))
+            return cursor.rowcount > 0
+    def update_task(self, task_id: str, user_id: str, updates: dict) -> Optional[Task]:
+        # Column names come from the caller's whitelist; values are always bound
+        set_clause = ', '.join(f"{k} = ?" for k in updates.keys())
+        values = list(updates.values())
+        values.extend([task_id, user_id])
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                UPDATE tasks
+                SET {set_clause}
+                WHERE id = ? AND user_id = ?
+                RETURNING {TASK_SELECT}
+            """, values)
+            row = cursor.fetchone()
+            return self._row_to_task(row) if row else None
+    def delete_task(self, task_id: str, user_id: str) -> bool:
+        # Removes the task with its whole subtask hierarchy in one statement
+        with self.connection() as conn:
+            # rowcount is -1 for statements starting with WITH (before Python 3.12)
+            before = conn.total_changes
+            conn.execute(DELETE_SUBTREE, (task_id, user_id, user_id))
+            return conn.total_changes > before
+    def get_task_tree(self, task_id: str, user_id: str, max_depth: int = 10) -> Optional[Task]:
+        # Whole hierarchy in one query; nested subtasks are linked in one pass over the rows
+        with self.connection() as conn:
+            rows = conn.execute(TASK_TREE, (task_id, user_id, user_id, max_depth)).fetchall()
+        if not rows:
+            return None
+        nodes: Dict[str, Task] = {}
+        for row in rows:
+            # A parent cycle can revisit a node at a deeper level; the first visit wins
+            if row[0] not in nodes:
+                nodes[row[0]] = self._row_to_task(row)
+        root = nodes[task_id]
+        for task in nodes.values():
+            if task is not root:
+                parent = nodes.get(task.parent_task_id)
+                if parent is not None:
+                    parent.subtasks.append(task)
+        return root
+    def run_batch(self, user_id: str, operations: Sequence[Tuple[str, Any]]) -> List[bool]:
+        # operations: ("create", Task) | ("complete", task_id) | ("delete", task_id), applied in order
+        # in one transaction; consecutive operations of one kind share an executemany.
+        # Returns, per operation, whether it applied (False: task not found for this user).
+        results: List[bool] = []
+        with self.connection() as conn:
+            for op, run in itertools.groupby(operations, key=lambda operation: operation[0]):
+                items = [item for _, item in run]
+                results.extend(self._BATCH_HANDLERS[op](self, conn, user_id, items))
+        return results
+    def _existing_ids(self, conn: sqlite3.Connection, user_id: str, task_ids: Sequence[str]) -> set:
+        found = set()
+        unique = list(dict.fromkeys(task_ids))
+        for start in range(0, len(unique), IN_CHUNK):
+            chunk = unique[start:start + IN_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            found.update(row[0] for row in conn.execute(
+                EXISTING_IDS.format(placeholders=placeholders), [user_id, *chunk]))
+        return found
+    def _batch_create(self, conn: sqlite3.Connection, user_id: str, tasks: List[Task]) -> List[bool]:
+        conn.executemany(INSERT_TASK, [_task_params(task) for task in tasks])
+        return [True] * len(tasks)
+    def _batch_complete(self, conn: sqlite3.Connection, user_id: str, task_ids: List[str]) -> List[bool]:
+        existing = self._existing_ids(conn, user_id, task_ids)
+        conn.executemany(MARK_COMPLETED,
+                         [(task_id, user_id) for task_id in existing])
+        return [task_id in existing for task_id in task_ids]
+    def _batch_delete(self, conn: sqlite3.Connection, user_id: str, task_ids: List[str]) -> List[bool]:
+        existing = self._existing_ids(conn, user_id, task_ids)
+        # Same semantics as delete_task: each task goes with its whole subtask hierarchy
+        conn.executemany(DELETE_SUBTREE, [(task_id, user_id, user_id) for task_id in existing])
+        results = []
+        for task_id in task_ids:
+            # A repeated id is only deleted once
+            results.append(task_id in existing)
+            existing.discard(task_id)
+        return results
+    _BATCH_HANDLERS = {
+        "create": _batch_create,
+        "complete": _batch_complete,
+        "delete": _batch_delete,
+    }
     def _row_to_task(self, row) -> Task:
-        # Convert database row to Task object
-        return Task(
-            id=row[0],
-            title=row[1],
-            description=row[2],
-            priority=Priority(row[3]),
-            due_date=row[4],
-            created_at=row[5],
-            tags=json.loads(row[6]),
-            category=row[7],
-            completed=bool(row[8]),
-            user_id=row[9],
-            recurrence=RecurrenceType(row[10]),
-            parent_task_id=row[11],
-            points=row[12],
-            subtasks=[]
-        )
\ No newline at end of file
+        # Convert database row (TASK_COLUMNS first) to Task object
+        return TaskRow(row[:len(TASK_COLUMNS)]).to_task()
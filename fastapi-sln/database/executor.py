@@ -0,0 +1,31 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+class DatabaseExecutor:
+    """
+    Runs blocking DatabaseManager calls off the event loop.
+    Writes go through a single thread, so they never contend for SQLite's write lock;
+    reads share a bounded pool and run concurrently under WAL. Each thread keeps its
+    own pooled connection (see DatabaseManager._get_connection).
+    """
+    def __init__(self, readers: int = 8):
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+
+    async def _run(self, pool: ThreadPoolExecutor, fn: Callable[..., T], *args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+
+    async def read(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        return await self._run(self._readers, fn, *args, **kwargs)
+
+    async def write(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        return await self._run(self._writer, fn, *args, **kwargs)
+
+    def shutdown(self):
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
@@ -0,0 +1,285 @@
+# Recomputes task_stats from tasks (migration 7 backfill and DatabaseManager.rebuild_stats).
+# One pass over tasks groups by (user, priority, category); the three rollups read that result.
+# Starts with WITH, so run it after a DELETE has opened the transaction.
+REBUILD_TASK_STATS = """
+    WITH grouped AS MATERIALIZED (
+        SELECT user_id, priority, COALESCE(category, '') AS category, COUNT(*) AS total,
+               SUM(CASE WHEN completed THEN 1 ELSE 0 END) AS completed,
+               SUM(COALESCE(points, 0)) AS points,
+               SUM(CASE WHEN completed THEN COALESCE(points, 0) ELSE 0 END) AS earned_points
+        FROM tasks GROUP BY user_id, priority, COALESCE(category, '')
+    )
+    INSERT INTO task_stats (user_id, dimension, value, total, completed, points, earned_points)
+    SELECT user_id, 'all', '', SUM(total), SUM(completed), SUM(points), SUM(earned_points)
+        FROM grouped GROUP BY user_id
+    UNION ALL
+    SELECT user_id, 'priority', priority, SUM(total), SUM(completed), SUM(points), SUM(earned_points)
+        FROM grouped GROUP BY user_id, priority
+    UNION ALL
+    SELECT user_id, 'category', category, SUM(total), SUM(completed), SUM(points), SUM(earned_points)
+        FROM grouped GROUP BY user_id, category
+"""
+
+# Schema migrations applied in order by DatabaseManager._migrate.
+# The applied version is tracked in PRAGMA user_version; each entry runs in one transaction.
+# Never edit an entry that has shipped: append a new version instead.
+MIGRATIONS = [
+    (1, [
+        # get_tasks / listing filters: WHERE user_id = ? [AND completed = ?] [ORDER BY due_date]
+        "CREATE INDEX IF NOT EXISTS idx_tasks_user_completed_due ON tasks (user_id, completed, due_date)",
+        # Subtask cascade in delete_task: WHERE parent_task_id = ? AND user_id = ?
+        "CREATE INDEX IF NOT EXISTS idx_tasks_parent_user ON tasks (parent_task_id, user_id)",
+    ]),
+    (2, [
+        # Default keyset order of list_tasks: ORDER BY created_at, id within one user
+        "CREATE INDEX IF NOT EXISTS idx_tasks_user_created ON tasks (user_id, created_at, id)",
+    ]),
+    (3, [
+        # Inverted tag index. tasks.tags stays the JSON list returned to clients; these
+        # triggers keep task_tags in step with every insert, tag update and delete.
+        """CREATE TABLE IF NOT EXISTS task_tags (
+            user_id TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            task_id TEXT NOT NULL,
+            PRIMARY KEY (user_id, tag, task_id)
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS idx_task_tags_task ON task_tags (task_id)",
+        """INSERT OR IGNORE INTO task_tags (user_id, tag, task_id)
+            SELECT tasks.user_id, tag.value, tasks.id
+            FROM tasks, json_each(COALESCE(tasks.tags, '[]')) AS tag
+            WHERE tag.type = 'text'""",
+        """CREATE TRIGGER IF NOT EXISTS task_tags_insert AFTER INSERT ON tasks BEGIN
+            INSERT OR IGNORE INTO task_tags (user_id, tag, task_id)
+                SELECT NEW.user_id, value, NEW.id FROM json_each(COALESCE(NEW.tags, '[]')) WHERE type = 'text';
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS task_tags_update AFTER UPDATE OF tags, user_id ON tasks BEGIN
+            DELETE FROM task_tags WHERE task_id = OLD.id;
+            INSERT OR IGNORE INTO task_tags (user_id, tag, task_id)
+                SELECT NEW.user_id, value, NEW.id FROM json_each(COALESCE(NEW.tags, '[]')) WHERE type = 'text';
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS task_tags_delete AFTER DELETE ON tasks BEGIN
+            DELETE FROM task_tags WHERE task_id = OLD.id;
+        END""",
+    ]),
+    (4, [
+        # Full-text index over title and description, stored as an external-content FTS5 table:
+        # the text lives only in tasks, keyed by tasks.rowid. user_id is indexed too so a search
+        # is scoped to one user inside the index instead of after ranking every user's matches.
+        # tasks has no INTEGER PRIMARY KEY, so VACUUM may renumber its rowids; run
+        # INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild') after a VACUUM.
+        """CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            title, description, user_id,
+            content = 'tasks', content_rowid = 'rowid',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )""",
+        # rank = bm25 with title matches weighted over description; the user_id column never scores
+        "INSERT INTO tasks_fts (tasks_fts, rank) VALUES ('rank', 'bm25(4.0, 1.0, 0.0)')",
+        "INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')",
+        """CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, title, description, user_id)
+                VALUES (NEW.rowid, NEW.title, NEW.description, NEW.user_id);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description, user_id ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description, user_id)
+                VALUES ('delete', OLD.rowid, OLD.title, OLD.description, OLD.user_id);
+            INSERT INTO tasks_fts (rowid, title, description, user_id)
+                VALUES (NEW.rowid, NEW.title, NEW.description, NEW.user_id);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description, user_id)
+                VALUES ('delete', OLD.rowid, OLD.title, OLD.description, OLD.user_id);
+        END""",
+    ]),
+    (5, [
+        # Per-user change sequence for incremental sync and ETags. task_change_seq holds each
+        # user's latest seq; task_changes is the append-only log, one row per task write, filled
+        # by triggers in the writing transaction. Existing tasks are logged as inserts.
+        """CREATE TABLE IF NOT EXISTS task_change_seq (
+            user_id TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL
+        ) WITHOUT ROWID""",
+        """CREATE TABLE IF NOT EXISTS task_changes (
+            user_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            task_id TEXT NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, seq)
+        ) WITHOUT ROWID""",
+        """INSERT OR IGNORE INTO task_changes (user_id, seq, task_id, op)
+            SELECT user_id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at, id), id, 'insert'
+            FROM tasks""",
+        """INSERT OR IGNORE INTO task_change_seq (user_id, seq)
+            SELECT user_id, COUNT(*) FROM tasks GROUP BY user_id""",
+        """CREATE TRIGGER IF NOT EXISTS task_changes_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_change_seq (user_id, seq) VALUES (NEW.user_id, 1)
+                ON CONFLICT (user_id) DO UPDATE SET seq = seq + 1;
+            INSERT INTO task_changes (user_id, seq, task_id, op)
+                SELECT user_id, seq, NEW.id, 'insert' FROM task_change_seq WHERE user_id = NEW.user_id;
+        END""",
+        # No-op updates (e.g. completing a completed task) don't bump the seq, so ETags stay valid
+        """CREATE TRIGGER IF NOT EXISTS task_changes_update AFTER UPDATE ON tasks
+        WHEN OLD.title IS NOT NEW.title OR OLD.description IS NOT NEW.description
+            OR OLD.priority IS NOT NEW.priority OR OLD.due_date IS NOT NEW.due_date
+            OR OLD.created_at IS NOT NEW.created_at OR OLD.tags IS NOT NEW.tags
+            OR OLD.category IS NOT NEW.category OR OLD.completed IS NOT NEW.completed
+            OR OLD.user_id IS NOT NEW.user_id OR OLD.recurrence IS NOT NEW.recurrence
+            OR OLD.parent_task_id IS NOT NEW.parent_task_id OR OLD.points IS NOT NEW.points
+        BEGIN
+            INSERT INTO task_change_seq (user_id, seq) VALUES (NEW.user_id, 1)
+                ON CONFLICT (user_id) DO UPDATE SET seq = seq + 1;
+            INSERT INTO task_changes (user_id, seq, task_id, op)
+                SELECT user_id, seq, NEW.id, 'update' FROM task_change_seq WHERE user_id = NEW.user_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS task_changes_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO task_change_seq (user_id, seq) VALUES (OLD.user_id, 1)
+                ON CONFLICT (user_id) DO UPDATE SET seq = seq + 1;
+            INSERT INTO task_changes (user_id, seq, task_id, op)
+                SELECT user_id, seq, OLD.id, 'delete' FROM task_change_seq WHERE user_id = OLD.user_id;
+        END""",
+    ]),
+    (6, [
+        # Recurring task schedule, one row per series: its head (latest occurrence) and when the
+        # next occurrence is due. RecurrenceScheduler reads it through the next_due index and
+        # fills series_id / anchor_due / occurrence / next_due for heads registered here with NULLs.
+        """CREATE TABLE IF NOT EXISTS task_recurrences (
+            task_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            series_id TEXT,
+            anchor_due TIMESTAMP,
+            occurrence INTEGER,
+            next_due TIMESTAMP
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS idx_task_recurrences_next_due ON task_recurrences (next_due)",
+        """INSERT OR IGNORE INTO task_recurrences (task_id, user_id)
+            SELECT id, user_id FROM tasks
+            WHERE recurrence IN ('daily', 'weekly', 'monthly') AND due_date IS NOT NULL""",
+        """CREATE TRIGGER IF NOT EXISTS task_recurrences_insert AFTER INSERT ON tasks
+        WHEN NEW.recurrence IN ('daily', 'weekly', 'monthly') AND NEW.due_date IS NOT NULL BEGIN
+            INSERT OR IGNORE INTO task_recurrences (task_id, user_id) VALUES (NEW.id, NEW.user_id);
+        END""",
+        # A head whose due date or recurrence changes restarts its series from the new values
+        """CREATE TRIGGER IF NOT EXISTS task_recurrences_update AFTER UPDATE OF due_date, recurrence ON tasks
+        WHEN EXISTS (SELECT 1 FROM task_recurrences WHERE task_id = OLD.id) BEGIN
+            DELETE FROM task_recurrences WHERE task_id = OLD.id;
+            INSERT INTO task_recurrences (task_id, user_id)
+                SELECT NEW.id, NEW.user_id
+                WHERE NEW.recurrence IN ('daily', 'weekly', 'monthly') AND NEW.due_date IS NOT NULL;
+        END""",
+        # A one-off task that becomes recurring starts a new series
+        """CREATE TRIGGER IF NOT EXISTS task_recurrences_start AFTER UPDATE OF due_date, recurrence ON tasks
+        WHEN (OLD.recurrence NOT IN ('daily', 'weekly', 'monthly') OR OLD.due_date IS NULL)
+            AND NEW.recurrence IN ('daily', 'weekly', 'monthly') AND NEW.due_date IS NOT NULL BEGIN
+            INSERT OR IGNORE INTO task_recurrences (task_id, user_id) VALUES (NEW.id, NEW.user_id);
+        END""",
+        # Deleting a series' latest occurrence ends the series
+        """CREATE TRIGGER IF NOT EXISTS task_recurrences_delete AFTER DELETE ON tasks BEGIN
+            DELETE FROM task_recurrences WHERE task_id = OLD.id;
+        END""",
+    ]),
+    (7, [
+        # Per-user dashboard aggregates: one row per (user, dimension, value) for dimension 'all'
+        # (value ''), 'priority' and 'category' ('' = uncategorized). Kept exact by triggers in the
+        # writing transaction; REBUILD_TASK_STATS recomputes it from scratch.
+        """CREATE TABLE IF NOT EXISTS task_stats (
+            user_id TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            points INTEGER NOT NULL DEFAULT 0,
+            earned_points INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, dimension, value)
+        ) WITHOUT ROWID""",
+        "DELETE FROM task_stats",
+        REBUILD_TASK_STATS,
+        # Each trigger statement adds (or, for OLD, subtracts) one task under its three stat keys.
+        # "WHERE true" resolves the parser ambiguity of an upsert fed by a SELECT with a join.
+        """CREATE TRIGGER IF NOT EXISTS task_stats_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_stats (user_id, dimension, value, total, completed, points, earned_points)
+                SELECT NEW.user_id, stat.dimension, stat.value, 1, task.done, task.points, task.done * task.points
+                FROM (SELECT CASE WHEN NEW.completed THEN 1 ELSE 0 END AS done, COALESCE(NEW.points, 0) AS points) AS task,
+                     (SELECT 'all' AS dimension, '' AS value UNION ALL SELECT 'priority', NEW.priority
+                      UNION ALL SELECT 'category', COALESCE(NEW.category, '')) AS stat
+                WHERE true
+                ON CONFLICT (user_id, dimension, value) DO UPDATE SET
+                    total = total + excluded.total, completed = completed + excluded.completed,
+                    points = points + excluded.points, earned_points = earned_points + excluded.earned_points;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS task_stats_update AFTER UPDATE OF priority, category, completed, points, user_id ON tasks
+        WHEN OLD.priority IS NOT NEW.priority OR OLD.category IS NOT NEW.category
+            OR OLD.completed IS NOT NEW.completed OR OLD.points IS NOT NEW.points
+            OR OLD.user_id IS NOT NEW.user_id
+        BEGIN
+            INSERT INTO task_stats (user_id, dimension, value, total, completed, points, earned_points)
+                SELECT OLD.user_id, stat.dimension, stat.value, -1, -task.done, -task.points, -task.done * task.points
+                FROM (SELECT CASE WHEN OLD.completed THEN 1 ELSE 0 END AS done, COALESCE(OLD.points, 0) AS points) AS task,
+                     (SELECT 'all' AS dimension, '' AS value UNION ALL SELECT 'priority', OLD.priority
+                      UNION ALL SELECT 'category', COALESCE(OLD.category, '')) AS stat
+                WHERE true
+                ON CONFLICT (user_id, dimension, value) DO UPDATE SET
+                    total = total + excluded.total, completed = completed + excluded.completed,
+                    points = points + excluded.points, earned_points = earned_points + excluded.earned_points;
+            INSERT INTO task_stats (user_id, dimension, value, total, completed, points, earned_points)
+                SELECT NEW.user_id, stat.dimension, stat.value, 1, task.done, task.points, task.done * task.points
+                FROM (SELECT CASE WHEN NEW.completed THEN 1 ELSE 0 END AS done, COALESCE(NEW.points, 0) AS points) AS task,
+                     (SELECT 'all' AS dimension, '' AS value UNION ALL SELECT 'priority', NEW.priority
+                      UNION ALL SELECT 'category', COALESCE(NEW.category, '')) AS stat
+                WHERE true
+                ON CONFLICT (user_id, dimension, value) DO UPDATE SET
+                    total = total + excluded.total, completed = completed + excluded.completed,
+                    points = points + excluded.points, earned_points = earned_points + excluded.earned_points;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS task_stats_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO task_stats (user_id, dimension, value, total, completed, points, earned_points)
+                SELECT OLD.user_id, stat.dimension, stat.value, -1, -task.done, -task.points, -task.done * task.points
+                FROM (SELECT CASE WHEN OLD.completed THEN 1 ELSE 0 END AS done, COALESCE(OLD.points, 0) AS points) AS task,
+                     (SELECT 'all' AS dimension, '' AS value UNION ALL SELECT 'priority', OLD.priority
+                      UNION ALL SELECT 'category', COALESCE(OLD.category, '')) AS stat
+                WHERE true
+                ON CONFLICT (user_id, dimension, value) DO UPDATE SET
+                    total = total + excluded.total, completed = completed + excluded.completed,
+                    points = points + excluded.points, earned_points = earned_points + excluded.earned_points;
+        END""",
+    ]),
+    (8, [
+        # Sort rank of priority as a real (virtual, computed on read) column, so the priority
+        # keyset can seek on (priority_rank, id) like the other sort keys
+        """ALTER TABLE tasks ADD COLUMN priority_rank INTEGER GENERATED ALWAYS AS (
+            CASE priority WHEN 'high' THEN 3 WHEN 'medium' THEN 2 WHEN 'low' THEN 1 END) VIRTUAL""",
+        # The other keyset orders of list_tasks (created_at has idx_tasks_user_created): a page
+        # walks the index from the cursor instead of sorting all of the user's tasks
+        "CREATE INDEX IF NOT EXISTS idx_tasks_user_due ON tasks (user_id, due_date, id)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_user_title ON tasks (user_id, title, id)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_user_priority ON tasks (user_id, priority_rank, id)",
+    ]),
+    (9, [
+        # Tasks created through the API were stored with 0 points: give them their priority's
+        # points (models.task.PRIORITY_POINTS as of this version), then recompute task_stats.
+        # No route sets points, so a 0 (or NULL) can only come from that create path. Only those
+        # rows change, and each logs one change so synced clients pick up its points.
+        """UPDATE tasks SET points = CASE priority WHEN 'high' THEN 10 WHEN 'medium' THEN 5 ELSE 2 END
+        WHERE COALESCE(points, 0) = 0""",
+        "DELETE FROM task_stats",
+        REBUILD_TASK_STATS,
+    ]),
+    (10, [
+        # changes_since walks the log in seq order and skips rows superseded by a newer change of
+        # the same task; this index answers that probe and the compaction trigger's delete
+        "CREATE INDEX IF NOT EXISTS idx_task_changes_task ON task_changes (user_id, task_id, seq)",
+        # Only a task's latest change is ever returned, so older ones are dropped as they are
+        # superseded: the log keeps one row per live task plus delete markers (tombstones)
+        """DELETE FROM task_changes WHERE EXISTS (
+            SELECT 1 FROM task_changes AS newer
+            WHERE newer.user_id = task_changes.user_id AND newer.task_id = task_changes.task_id
+                AND newer.seq > task_changes.seq)""",
+        """CREATE TRIGGER IF NOT EXISTS task_changes_compact AFTER INSERT ON task_changes BEGIN
+            DELETE FROM task_changes
+            WHERE user_id = NEW.user_id AND task_id = NEW.task_id AND seq < NEW.seq;
+        END""",
+        # Tombstones past the retention are pruned (see ChangeLogPruner). pruned_seq is the user's
+        # highest pruned seq: a sync resuming from before it may have missed a deletion.
+        "ALTER TABLE task_change_seq ADD COLUMN pruned_seq INTEGER NOT NULL DEFAULT 0",
+        "CREATE INDEX IF NOT EXISTS idx_task_changes_tombstones ON task_changes (changed_at) WHERE op = 'delete'",
+    ]),
+]
@@ -0,0 +1,97 @@
+import json
+from typing import Callable, Iterable, Iterator, List
+from models.task import Task, Priority, RecurrenceType
+
+# Enum members by stored value: a dict hit per row instead of Enum.__call__
+PRIORITIES = {p.value: p for p in Priority}
+RECURRENCES = {r.value: r for r in RecurrenceType}
+
+# Explicit column list so row positions don't depend on later ALTER TABLEs
+TASK_COLUMNS = ("id", "title", "description", "priority", "due_date", "created_at", "tags",
+                "category", "completed", "user_id", "recurrence", "parent_task_id", "points")
+TASK_SELECT = ", ".join(TASK_COLUMNS)
+_WIDTH = len(TASK_COLUMNS)
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+class TaskRow:
+    """
+    Read-only view of one tasks row. Tags stay as the stored JSON text until
+    accessed, and to_json splices that text in without decoding it.
+    """
+    __slots__ = tuple(c for c in TASK_COLUMNS if c != "tags") + ("_tags",)
+
+    def __init__(self, values):
+        (self.id, self.title, self.description, self.priority, self.due_date, self.created_at,
+         self._tags, self.category, self.completed, self.user_id, self.recurrence,
+         self.parent_task_id, self.points) = values
+
+    @classmethod
+    def factory(cls, cursor, row) -> "TaskRow":
+        # sqlite3 row_factory signature; trailing columns (e.g. a sort key) are ignored
+        return cls(row[:_WIDTH])
+
+    @property
+    def tags(self) -> List[str]:
+        return json.loads(self._tags) if self._tags else []
+
+    def to_task(self) -> Task:
+        return Task(
+            id=self.id,
+            title=self.title,
+            description=self.description,
+            priority=PRIORITIES[self.priority],
+            due_date=self.due_date,
+            created_at=self.created_at,
+            tags=self.tags,
+            category=self.category,
+            completed=bool(self.completed),
+            user_id=self.user_id,
+            recurrence=RECURRENCES[self.recurrence],
+            parent_task_id=self.parent_task_id,
+            subtasks=[],
+            points=self.points,
+        )
+
+    def to_json(self) -> str:
+        # Same fields and formats as the List[Task] response model
+        head = _dumps({
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "priority": self.priority,
+            "due_date": self.due_date,
+            "created_at": self.created_at,
+            "category": self.category,
+            "completed": bool(self.completed),
+            "user_id": self.user_id,
+            "recurrence": self.recurrence,
+            "parent_task_id": self.parent_task_id,
+            "subtasks": [],
+            "points": self.points,
+        })
+        return f'{head[:-1]},"tags":{self._tags or "[]"}}}'
+
+def iter_json_array(rows: Iterable[TaskRow], batch_size: int = 500,
+                    encode: Callable[[TaskRow], str] = TaskRow.to_json) -> Iterator[bytes]:
+    # Encodes a JSON array incrementally, one chunk per batch_size rows
+    yield b"["
+    batch: List[str] = []
+    first = True
+    for row in rows:
+        batch.append(encode(row))
+        if len(batch) >= batch_size:
+            yield (("" if first else ",") + ",".join(batch)).encode()
+            first = False
+            batch = []
+    if batch:
+        yield (("" if first else ",") + ",".join(batch)).encode()
+    yield b"]"
+
+def iter_json_snapshot(seq: int, rows: Iterable[TaskRow], batch_size: int = 500) -> Iterator[bytes]:
+    # A TaskChanges document listing every row as a change at `seq`, encoded incrementally
+    def encode(row: TaskRow) -> str:
+        return f'{{"seq":{seq},"task_id":{_dumps(row.id)},"deleted":false,"task":{row.to_json()}}}'
+    yield f'{{"seq":{seq},"changes":'.encode()
+    yield from iter_json_array(rows, batch_size, encode)
+    yield b',"has_more":false}'
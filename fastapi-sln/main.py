@@ -1,14 +1,27 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from typing import List
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm, HTTPBasic, HTTPBasicCredentials
+from datetime import datetime, timedelta
+from typing import List, Optional
+import os
+import sqlite3
 import uvicorn
 
-from models.task import Task, TaskCreate
+from models.task import (Task, TaskCreate, Priority, TaskBatchRequest, TaskIdsRequest, TaskBatchResult,
+                         TaskSearchHit, TaskChanges, UserStats)
 from models.user import User, UserCreate
+from models.jira import JiraSearchRequest, JiraSearchResponse, JiraIssueCreate, JiraIssueCreated
 from services.auth import AuthService
+from services.passwords import PasswordHasher
 from services.task import TaskService
-from database.db_manager import DatabaseManager
+from services.scheduler import RecurrenceScheduler
+from services.changelog import ChangeLogPruner
+from services.jira_service import JiraService, JiraError
+from services.metrics import MetricsMiddleware, observe_upstream, registry
+from database.db_manager import ChangeLogExpired, DatabaseManager
+from database.executor import DatabaseExecutor
+from database.rows import iter_json_array, iter_json_snapshot
 
 app = FastAPI()
 
@@ -20,54 +33,264 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Same per-route/upstream instrumentation as the Flask app; exposed at /metrics
+app.add_middleware(MetricsMiddleware)
 
 # Initialize services
 db_manager = DatabaseManager()
-auth_service = AuthService(db_manager)
-task_service = TaskService(db_manager)
+# Blocking sqlite3 calls run here: one writer thread, a bounded pool of readers
+db_executor = DatabaseExecutor(readers=int(os.getenv("DB_READ_THREADS", 8)))
+password_hasher = PasswordHasher(workers=int(os.getenv("BCRYPT_WORKERS", 0)) or None)
+auth_service = AuthService(db_manager, db_executor, password_hasher)
+task_service = TaskService(db_manager, db_executor)
+# Creates upcoming occurrences of recurring tasks in the background (see RecurrenceScheduler)
+recurrence_scheduler = RecurrenceScheduler(
+    db_manager, db_executor, interval=float(os.getenv("RECURRENCE_TICK_SECONDS", 60)))
+# Expires sync tombstones of deleted tasks after CHANGE_LOG_RETENTION_DAYS (see ChangeLogPruner)
+change_log_pruner = ChangeLogPruner(
+    db_manager, db_executor, retention=timedelta(days=float(os.getenv("CHANGE_LOG_RETENTION_DAYS", 30))))
+jira_service = JiraService(
+    max_connections=int(os.getenv("JIRA_MAX_CONNECTIONS", 200)),
+    timeout=float(os.getenv("JIRA_HTTP_TIMEOUT", 30)),
+    observer=observe_upstream,
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+jira_basic = HTTPBasic()
+
+@app.on_event("startup")
+async def start_recurrence_scheduler():
+    recurrence_scheduler.start()
+
+@app.on_event("startup")
+async def start_change_log_pruner():
+    change_log_pruner.start()
+
+@app.on_event("shutdown")
+async def close_jira_client():
+    await jira_service.aclose()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    # Before close_database: a tick in progress still needs the executor
+    await recurrence_scheduler.stop()
+    await change_log_pruner.stop()
+
+@app.on_event("shutdown")
+def close_database():
+    password_hasher.shutdown()
+    db_executor.shutdown()
+    db_manager.close()
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    # Both lookups are cached in AuthService: a repeat request does no JWT decode and no query
     user_id = auth_service.verify_token(token)
-    if not user_id:
+    if not user_id or await auth_service.get_user(user_id) is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
         )
     return user_id
 
+# Task responses are versioned by the user's change sequence: any task write bumps it,
+# so a client holding the current ETag is answered 304 without reading its tasks.
+def etag_for(seq: int) -> str:
+    return f'W/"{seq}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or etag[2:] in tags
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+# Password hashing runs in AuthService's process pool (BCRYPT_ROUNDS / BCRYPT_WORKERS)
 @app.post("/api/register")
 async def register(user_data: UserCreate):
-    # Implementation for user registration
-    pass
+    try:
+        user_id = await auth_service.register_user(user_data.username, user_data.password)
+    except sqlite3.IntegrityError:
+        raise HTTPException(status_code=409, detail="Username already registered")
+    return {"id": user_id, "username": user_data.username}
 
 @app.post("/api/login")
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    # Implementation for user login
-    pass
+    user_id = await auth_service.authenticate(form_data.username, form_data.password)
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+        )
+    return {"access_token": auth_service.create_access_token({"sub": user_id}), "token_type": "bearer"}
 
+# Keyset pagination: pass the X-Next-Cursor response header back as ?cursor= for the next page.
+# Repeat ?tag= to require all of several tags.
 @app.get("/api/tasks", response_model=List[Task])
-async def get_tasks(current_user: str = Depends(get_current_user)):
-    return task_service.get_user_tasks(current_user)
+async def get_tasks(response: Response,
+                    completed: Optional[bool] = None,
+                    priority: Optional[Priority] = None,
+                    category: Optional[str] = None,
+                    tag: List[str] = Query([]),
+                    due_from: Optional[datetime] = None,
+                    due_to: Optional[datetime] = None,
+                    sort: str = Query("created_at", pattern="^(created_at|due_date|title|priority)$"),
+                    order: str = Query("asc", pattern="^(asc|desc)$"),
+                    limit: int = Query(100, ge=1, le=500),
+                    cursor: Optional[str] = None,
+                    if_none_match: Optional[str] = Header(None),
+                    current_user: str = Depends(get_current_user)):
+    # Read the seq before the page: a write in between then only costs the client one extra download
+    etag = etag_for(await task_service.change_seq(current_user))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    try:
+        tasks, next_cursor = await task_service.list_tasks(
+            current_user, completed=completed,
+            priority=priority.value if priority else None,
+            category=category, tags=tag, due_from=due_from, due_to=due_to,
+            sort=sort, descending=order == "desc", limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return tasks
+
+# Whole filtered list as one JSON array, encoded row by row: memory stays flat for any list size
+@app.get("/api/tasks/stream", response_model=List[Task])
+async def stream_tasks(completed: Optional[bool] = None,
+                       priority: Optional[Priority] = None,
+                       category: Optional[str] = None,
+                       tag: List[str] = Query([]),
+                       due_from: Optional[datetime] = None,
+                       due_to: Optional[datetime] = None,
+                       sort: str = Query("created_at", pattern="^(created_at|due_date|title|priority)$"),
+                       order: str = Query("asc", pattern="^(asc|desc)$"),
+                       current_user: str = Depends(get_current_user)):
+    rows = task_service.iter_tasks(
+        current_user, completed=completed,
+        priority=priority.value if priority else None,
+        category=category, tags=tag, due_from=due_from, due_to=due_to,
+        sort=sort, descending=order == "desc")
+    return StreamingResponse(iter_json_array(rows), media_type="application/json")
+
+# Incremental sync: returns each task changed after ?since= (deleted ones flagged) and the seq
+# to pass as ?since= next time; repeat while has_more. Start from since=0 to get every task,
+# in one streamed response read from the tasks rather than the change log.
+# 410: ?since= is older than the retained log (deletions may be missing); sync again from since=0.
+@app.get("/api/tasks/changes", response_model=TaskChanges)
+async def get_task_changes(response: Response,
+                           since: int = Query(0, ge=0),
+                           limit: int = Query(500, ge=1, le=1000),
+                           if_none_match: Optional[str] = Header(None),
+                           current_user: str = Depends(get_current_user)):
+    seq = await task_service.change_seq(current_user)
+    etag = etag_for(seq)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    if since >= seq:
+        # Up to date: answered from the sequence alone
+        return TaskChanges(seq=since, changes=[], has_more=False)
+    if since == 0:
+        # seq is read before the tasks: anything changed meanwhile comes again from ?since=seq
+        return StreamingResponse(iter_json_snapshot(seq, task_service.iter_tasks(current_user)),
+                                 media_type="application/json", headers={"ETag": etag})
+    try:
+        return await task_service.changes_since(current_user, since, limit)
+    except ChangeLogExpired as e:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(e))
+
+# Full-text search over title and description, best match first. Every word must match;
+# pass the X-Next-Offset response header back as ?offset= for the next page.
+@app.get("/api/tasks/search", response_model=List[TaskSearchHit])
+async def search_tasks(response: Response,
+                       q: str = Query(..., min_length=1, max_length=256),
+                       limit: int = Query(20, ge=1, le=100),
+                       offset: int = Query(0, ge=0, le=1000),
+                       current_user: str = Depends(get_current_user)):
+    try:
+        hits, more = await task_service.search_tasks(current_user, q, limit, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if more:
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return hits
+
+# Tag facets: [{"tag": ..., "count": ...}], most used first
+@app.get("/api/tags")
+async def get_tags(completed: Optional[bool] = None, current_user: str = Depends(get_current_user)):
+    counts = await task_service.tag_counts(current_user, completed)
+    return [{"tag": tag, "count": count} for tag, count in counts]
+
+# Dashboard totals from the precomputed task_stats table (rebuild with rebuild_stats.py)
+@app.get("/api/stats", response_model=UserStats)
+async def get_stats(current_user: str = Depends(get_current_user)):
+    return await task_service.get_stats(current_user)
 
 @app.post("/api/tasks", response_model=Task)
 async def create_task(task: TaskCreate, current_user: str = Depends(get_current_user)):
-    return task_service.create_task(current_user, task)
+    return await task_service.create_task(current_user, task)
+
+# Offline-sync clients: many operations per call, applied in order in a single transaction
+@app.post("/api/tasks/batch", response_model=List[TaskBatchResult])
+async def run_task_batch(batch: TaskBatchRequest, current_user: str = Depends(get_current_user)):
+    return await task_service.run_batch(current_user, batch.operations)
+
+@app.patch("/api/tasks/batch/complete", response_model=List[TaskBatchResult])
+async def complete_tasks(batch: TaskIdsRequest, current_user: str = Depends(get_current_user)):
+    return await task_service.complete_tasks(current_user, batch.task_ids)
+
+# Task with its nested subtasks (up to max_depth levels below it), loaded in one query
+@app.get("/api/tasks/{task_id}/tree", response_model=Task)
+async def get_task_tree(task_id: str, max_depth: int = Query(10, ge=0, le=64),
+                        current_user: str = Depends(get_current_user)):
+    task = await task_service.get_task_tree(task_id, current_user, max_depth)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
 
 @app.put("/api/tasks/{task_id}/complete")
 async def complete_task(task_id: str, current_user: str = Depends(get_current_user)):
-    success = task_service.complete_task(task_id, current_user)
+    success = await task_service.complete_task(task_id, current_user)
     if not success:
         raise HTTPException(status_code=404, detail="Task not found")
     return {"status": "success"}
 
 @app.delete("/api/tasks/{task_id}")
 async def delete_task(task_id: str, current_user: str = Depends(get_current_user)):
-    success = task_service.delete_task(task_id, current_user)
+    success = await task_service.delete_task(task_id, current_user)
     if not success:
         raise HTTPException(status_code=404, detail="Task not found")
     return {"status": "success"}
 
+# Jira proxy: email/API token via HTTP Basic, instance via X-Jira-Instance header
+def jira_error(e: JiraError) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.message)
+
+@app.post("/api/jira/search", response_model=JiraSearchResponse)
+async def jira_search(search: JiraSearchRequest,
+                      credentials: HTTPBasicCredentials = Depends(jira_basic),
+                      x_jira_instance: str = Header(...)):
+    try:
+        return await jira_service.search(x_jira_instance, credentials.username, credentials.password,
+                                         search.jql, search.start_at, min(search.max_results, 100))
+    except JiraError as e:
+        raise jira_error(e)
+
+@app.post("/api/jira/issues", response_model=JiraIssueCreated, status_code=201)
+async def jira_create_issue(issue: JiraIssueCreate,
+                            credentials: HTTPBasicCredentials = Depends(jira_basic),
+                            x_jira_instance: str = Header(...)):
+    try:
+        return await jira_service.create_issue(x_jira_instance, credentials.username, credentials.password,
+                                               issue.project_key, issue.issue_type_id, issue.summary,
+                                               issue.description)
+    except JiraError as e:
+        raise jira_error(e)
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=9090, reload=True)
\ No newline at end of file
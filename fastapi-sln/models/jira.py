@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from typing import List, Optional
+class JiraSearchRequest(BaseModel):
+    jql: str
+    start_at: int = 0
+    max_results: int = 100
+class JiraIssue(BaseModel):
+    key: str
+    url: str
+    summary: Optional[str] = None
+    status: str
+    assignee: Optional[str] = None
+    issuetype: str
+class JiraSearchResponse(BaseModel):
+    issues: List[JiraIssue]
+    start_at: int
+    max_results: int
+    total: int
+class JiraIssueCreate(BaseModel):
+    project_key: str
+    issue_type_id: str
+    summary: str
+    description: str = ""
+class JiraIssueCreated(BaseModel):
+    issue_key: str
+    issue_url: str
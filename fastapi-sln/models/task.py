@@ -1,13 +1,17 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 from enum import Enum
+from pydantic import BaseModel, Field
 
 class Priority(Enum):
     LOW = "low"
     MEDIUM = "medium"
     HIGH = "high"
     
+# Points a task is worth when created, by priority
+PRIORITY_POINTS = {Priority.HIGH: 10, Priority.MEDIUM: 5, Priority.LOW: 2}
+
 class RecurrenceType(Enum):
     DAILY = "daily"
     WEEKLY = "weekly"
@@ -29,4 +33,69 @@ class Task:
     recurrence: RecurrenceType
     parent_task_id: Optional[str]
     subtasks: List['Task']
-    points: int = 0
\ No newline at end of file
+    points: int = 0
+
+class TaskCreate(BaseModel):
+    title: str
+    description: Optional[str] = None
+    priority: Priority = Priority.MEDIUM
+    due_date: Optional[datetime] = None
+    tags: List[str] = []
+    category: Optional[str] = None
+    recurrence: RecurrenceType = RecurrenceType.NONE
+    parent_task_id: Optional[str] = None
+
+# Batch endpoints: one HTTP call and one transaction for many operations
+MAX_BATCH_OPERATIONS = 1000
+
+class TaskBatchOperation(BaseModel):
+    op: Literal["create", "complete", "delete"]
+    task: Optional[TaskCreate] = None     # for "create"
+    task_id: Optional[str] = None         # for "complete" / "delete"
+
+class TaskBatchRequest(BaseModel):
+    operations: List[TaskBatchOperation] = Field(..., max_length=MAX_BATCH_OPERATIONS)
+
+class TaskIdsRequest(BaseModel):
+    task_ids: List[str] = Field(..., max_length=MAX_BATCH_OPERATIONS)
+
+class TaskBatchResult(BaseModel):
+    op: str
+    task_id: Optional[str] = None
+    status: Literal["created", "completed", "deleted", "not_found", "invalid"]
+    task: Optional[Task] = None
+
+class TaskSearchHit(BaseModel):
+    task: Task
+    title: str                  # safe HTML: the escaped title with matched words wrapped in <mark>
+    snippet: Optional[str]      # safe HTML, likewise: best-matching fragment of the description, if any
+    score: float                # bm25 relevance, higher is better
+
+# Incremental sync: GET /api/tasks/changes?since=<seq>
+class TaskChange(BaseModel):
+    seq: int
+    task_id: str
+    deleted: bool
+    task: Optional[Task] = None     # current state; None when deleted
+
+class TaskChanges(BaseModel):
+    seq: int                        # pass back as ?since= on the next call
+    changes: List[TaskChange]
+    has_more: bool
+
+# GET /api/stats
+class TaskCounts(BaseModel):
+    total: int = 0
+    completed: int = 0
+    points: int = 0
+    earned_points: int = 0      # points of completed tasks
+
+class UserStats(BaseModel):
+    total: int
+    open: int
+    completed: int
+    overdue: int                # open tasks whose due date has passed
+    total_points: int
+    earned_points: int
+    by_priority: Dict[str, TaskCounts]
+    by_category: Dict[str, TaskCounts]      # "" = no category
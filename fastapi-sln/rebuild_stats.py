@@ -0,0 +1,11 @@
+import sys
+from database.db_manager import DatabaseManager
+
+# Recomputes the per-user task_stats aggregates from tasks in one SQL pass.
+# Usage: python rebuild_stats.py [path/to/todo.db]
+if __name__ == "__main__":
+    db_manager = DatabaseManager(sys.argv[1] if len(sys.argv) > 1 else "todo.db")
+    try:
+        print(f"Rebuilt task stats for {db_manager.rebuild_stats()} users")
+    finally:
+        db_manager.close()
@@ -1,28 +1,88 @@
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from models.user import User
-from database.db_manager import DatabaseManager
+from database.db_manager import DatabaseManager, USER_BY_ID, USER_CREDENTIALS
+from database.executor import DatabaseExecutor
+from services.cache import ExpiringLRU
+from services.passwords import PasswordHasher
 SECRET_KEY = "your-secret-key"  # In production, use environment variable
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_MISSING = object()
 class AuthService:
-    def __init__(self, db_manager: DatabaseManager):
+    # Verified tokens are cached until their exp claim, so a repeat request skips decode + HMAC;
+    # user rows are cached for user_ttl seconds. Every write to users below goes through
+    # invalidate_user; a row changed or deleted outside AuthService is seen within user_ttl.
+    def __init__(self, db_manager: DatabaseManager, executor: Optional[DatabaseExecutor] = None,
+                 hasher: Optional[PasswordHasher] = None,
+                 token_cache_size: int = 10000, user_cache_size: int = 10000, user_ttl: float = 30):
         self.db_manager = db_manager
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
-    def get_password_hash(self, password: str) -> str:
-        return pwd_context.hash(password)
+        self.executor = executor or DatabaseExecutor()
+        self.hasher = hasher or PasswordHasher()
+        self.user_ttl = user_ttl
+        self._tokens = ExpiringLRU(token_cache_size)
+        self._users = ExpiringLRU(user_cache_size)
+    def _insert_user(self, user_id: str, username: str, password_hash: str):
+        with self.db_manager.connection() as conn:
+            conn.execute("INSERT INTO users (id, username, password_hash) VALUES (?, ?, ?)",
+                         (user_id, username, password_hash))
+    async def register_user(self, username: str, password: str) -> str:
+        # sqlite3.IntegrityError when the username is taken
+        user_id = str(uuid.uuid4())
+        password_hash = await self.hasher.hash(password)
+        await self.executor.write(self._insert_user, user_id, username, password_hash)
+        self.invalidate_user(user_id)
+        return user_id
+    def _load_credentials(self, username: str) -> Optional[tuple]:
+        with self.db_manager.connection() as conn:
+            return conn.execute(USER_CREDENTIALS, (username,)).fetchone()
+    def _update_password_hash(self, user_id: str, password_hash: str):
+        with self.db_manager.connection() as conn:
+            conn.execute("UPDATE users SET password_hash = ? WHERE id = ?", (password_hash, user_id))
+    async def authenticate(self, username: str, password: str) -> Optional[str]:
+        row = await self.executor.read(self._load_credentials, username)
+        valid, new_hash = await self.hasher.verify_and_update(password, row[1] if row else None)
+        if not row or not valid:
+            return None
+        if new_hash:
+            # Stored with an old cost factor: upgrade now that the plaintext is at hand
+            await self.executor.write(self._update_password_hash, row[0], new_hash)
+            self.invalidate_user(row[0])
+        return row[0]
     def create_access_token(self, data: dict) -> str:
         to_encode = data.copy()
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         to_encode.update({"exp": expire})
         return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     def verify_token(self, token: str) -> Optional[str]:
+        user_id = self._tokens.get(token)
+        if user_id is not None:
+            return user_id
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            return payload.get("sub")
         except JWTError:
-            return None
\ No newline at end of file
+            return None
+        user_id = payload.get("sub")
+        # Tokens without exp are verified every time rather than cached forever
+        if user_id is not None and isinstance(payload.get("exp"), (int, float)):
+            self._tokens.put(token, user_id, payload["exp"])
+        return user_id
+    def _load_user(self, user_id: str) -> Optional[User]:
+        with self.db_manager.connection() as conn:
+            row = conn.execute(USER_BY_ID, (user_id,)).fetchone()
+        return User(id=row[0], username=row[1], created_at=row[2]) if row else None
+    async def get_user(self, user_id: str) -> Optional[User]:
+        user = self._users.get(user_id, _MISSING)
+        if user is _MISSING:
+            user = await self.executor.read(self._load_user, user_id)
+            # Unknown ids are cached too, so a token for a deleted user can't force a query per request
+            self._users.put(user_id, user, time.time() + self.user_ttl)
+        return user
+    def invalidate_user(self, user_id: str):
+        # Call after writing a user row: the next request reloads it (None once deleted, which
+        # get_current_user rejects) and decodes its tokens again instead of trusting the cache
+        self._users.pop(user_id)
+        self._tokens.discard_values(user_id)
@@ -1,7 +1,6 @@
 import hashlib
 import uuid
 from typing import Optional
-import sqlite3
 from database.db_manager import DatabaseManager
 
 class AuthService:
@@ -15,7 +14,7 @@ class AuthService:
         user_id = str(uuid.uuid4())
         password_hash = self.hash_password(password)
         
-        with sqlite3.connect(self.db_manager.db_path) as conn:
+        with self.db_manager.connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "INSERT INTO users (id, username, password_hash) VALUES (?, ?, ?)",
@@ -26,7 +25,7 @@ class AuthService:
     def authenticate(self, username: str, password: str) -> Optional[str]:
         password_hash = self.hash_password(password)
         
-        with sqlite3.connect(self.db_manager.db_path) as conn:
+        with self.db_manager.connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT id FROM users WHERE username = ? AND password_hash = ?",
@@ -0,0 +1,36 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+class ExpiringLRU:
+    """Bounded LRU whose entries each carry their own expiry (epoch seconds)."""
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            if item[1] <= time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return item[0]
+    def put(self, key: Hashable, value: Any, expires_at: float):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+    def discard_values(self, value: Any):
+        with self._lock:
+            for key in [key for key, item in self._data.items() if item[0] == value]:
+                del self._data[key]
+    def __len__(self) -> int:
+        return len(self._data)
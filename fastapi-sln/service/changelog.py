@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from database.db_manager import DatabaseManager
+from database.executor import DatabaseExecutor
+
+logger = logging.getLogger(__name__)
+
+def _utcnow() -> datetime:
+    # Naive UTC, like task_changes.changed_at (CURRENT_TIMESTAMP)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class ChangeLogPruner:
+    """
+    Bounds the sync change log. Superseded changes are dropped as they happen (migration 10),
+    so what is left to expire are the tombstones of deleted tasks: every interval, those
+    older than retention are pruned, batch_size per transaction, on the writer thread.
+    A client resuming from a seq before a pruned tombstone gets 410 and syncs from since=0.
+    """
+    def __init__(self, db_manager: DatabaseManager, executor: Optional[DatabaseExecutor] = None,
+                 clock: Callable[[], datetime] = _utcnow, retention: timedelta = timedelta(days=30),
+                 interval: float = 3600.0, batch_size: int = 10000):
+        self.db_manager = db_manager
+        self.executor = executor or DatabaseExecutor()
+        self.clock = clock
+        self.retention = retention
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def tick(self) -> int:
+        # Batches until none are left; other writes run between batches
+        before = self.clock() - self.retention
+        total = 0
+        while True:
+            pruned = await self.executor.write(self.db_manager.prune_changes, before, self.batch_size)
+            total += pruned
+            if pruned < self.batch_size:
+                return total
+
+    async def run(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("Change log pruning failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,162 @@
+import asyncio
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+import httpx
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+SEARCH_FIELDS = "key,summary,status,assignee,issuetype"
+
+class JiraError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+class JiraService:
+    """
+    Async Jira proxy sharing one httpx connection pool across all users.
+    Credentials are sent per request, so a single keep-alive pool serves every instance.
+    """
+    def __init__(self, max_connections: int = 200, max_keepalive: int = 50,
+                 timeout: float = 30.0, max_retries: int = 3, backoff_factor: float = 0.5,
+                 max_backoff: float = 30.0,
+                 observer: Optional[Callable[[str, str, str, float, int], None]] = None):
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive)
+        self.timeout = httpx.Timeout(timeout, connect=10.0)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        # Upper bound on any single wait, including a server-sent Retry-After
+        self.max_backoff = max_backoff
+        # observer(method, endpoint, status, seconds, content_length) is called for every attempt
+        self.observer = observer
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout,
+                                             headers={"Accept": "application/json"})
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def normalize_base_url(jira_instance: str) -> str:
+        base_url = jira_instance.strip()
+        if not base_url.startswith(("http://", "https://")):
+            base_url = f"https://{base_url}"
+        return base_url.rstrip("/")
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        delay = self.backoff_factor * (2 ** attempt) + random.uniform(0, self.backoff_factor)
+        return min(delay, self.max_backoff)
+
+    async def _request(self, method: str, url: str, auth: httpx.BasicAuth, **kwargs) -> httpx.Response:
+        # 429 is safe to retry for any method; 5xx and transport errors only for GET (no duplicate issues)
+        endpoint = httpx.URL(url).path
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, auth=auth, **kwargs)
+            except httpx.TransportError as e:
+                if self.observer is not None:
+                    self.observer(method, endpoint, "error", time.perf_counter() - started, 0)
+                if method != "GET" or attempt >= self.max_retries:
+                    raise JiraError(502, f"Could not reach Jira: {e}")
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            if self.observer is not None:
+                content_length = response.headers.get("Content-Length", "")
+                self.observer(method, endpoint, str(response.status_code), time.perf_counter() - started,
+                              int(content_length) if content_length.isdigit() else 0)
+            retryable = response.status_code == 429 or (
+                method == "GET" and response.status_code in RETRY_STATUS_CODES)
+            if not retryable or attempt >= self.max_retries:
+                return response
+            await asyncio.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    @staticmethod
+    def _raise_for_status(response: httpx.Response):
+        if response.status_code < 400:
+            return
+        try:
+            details = response.json()
+            message = f"{details.get('errorMessages', [])} {details.get('errors', {})}"
+        except ValueError:
+            message = response.text[:200]
+        raise JiraError(response.status_code, f"Jira error ({response.status_code}): {message}")
+
+    @staticmethod
+    def _json(response: httpx.Response) -> Dict[str, Any]:
+        # A proxy or SSO login page can answer 2xx with HTML: that is a bad gateway, not a crash
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            raise JiraError(502, f"Jira returned an invalid response ({response.status_code})")
+        return data
+
+    @staticmethod
+    def simplify_issue(issue: Dict[str, Any], base_url: str) -> Dict[str, Any]:
+        fields = issue.get("fields", {})
+        assignee = fields.get("assignee")
+        status = fields.get("status")
+        issuetype = fields.get("issuetype")
+        return {
+            "key": issue.get("key"),
+            "url": f"{base_url}/browse/{issue.get('key')}",
+            "summary": fields.get("summary"),
+            "status": status.get("name") if status else "N/A",
+            "assignee": assignee.get("displayName") if assignee else None,
+            "issuetype": issuetype.get("name") if issuetype else "N/A",
+        }
+
+    async def search(self, jira_instance: str, email: str, api_token: str, jql: str,
+                     start_at: int = 0, max_results: int = 100) -> Dict[str, Any]:
+        base_url = self.normalize_base_url(jira_instance)
+        params = {"jql": jql, "startAt": start_at, "maxResults": max_results, "fields": SEARCH_FIELDS}
+        response = await self._request("GET", f"{base_url}/rest/api/2/search",
+                                       httpx.BasicAuth(email, api_token), params=params)
+        self._raise_for_status(response)
+        data = self._json(response)
+        issues = [self.simplify_issue(issue, base_url) for issue in data.get("issues", [])]
+        return {
+            "issues": issues,
+            "start_at": data.get("startAt", start_at),
+            "max_results": data.get("maxResults", max_results),
+            "total": data.get("total", len(issues)),
+        }
+
+    async def create_issue(self, jira_instance: str, email: str, api_token: str, project_key: str,
+                           issue_type_id: str, summary: str, description: str = "") -> Dict[str, str]:
+        base_url = self.normalize_base_url(jira_instance)
+        payload = {
+            "fields": {
+                "project": {"key": project_key.upper()},
+                "issuetype": {"id": issue_type_id},
+                "summary": summary,
+                "description": {
+                    "type": "doc", "version": 1,
+                    "content": [{"type": "paragraph", "content": [{"type": "text", "text": description or " "}]}]
+                }
+            }
+        }
+        response = await self._request("POST", f"{base_url}/rest/api/3/issue",
+                                       httpx.BasicAuth(email, api_token), json=payload)
+        self._raise_for_status(response)
+        issue_key = self._json(response).get("key")
+        return {"issue_key": issue_key, "issue_url": f"{base_url}/browse/{issue_key}"}
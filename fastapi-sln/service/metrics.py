@@ -0,0 +1,185 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Sequence[str], values: Sequence, extra: Optional[str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Sequence = (), amount: float = 1):
+        labels = tuple(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket..., +Inf count, sum, total]
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Sequence = ()):
+        labels = tuple(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(state)) for labels, state in self._values.items())
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {state[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {state[-1]}")
+        return lines
+
+class MetricsRegistry:
+    """Metrics rendered in the Prometheus text exposition format."""
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: List[Tuple[str, str, Callable[[], dict]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_gauges(self, prefix: str, documentation: str, stats_fn: Callable[[], dict]):
+        # Numeric values of a stats dict (e.g. a cache's stats()) are exported as gauges
+        self._collectors.append((prefix, documentation, stats_fn))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, documentation, stats_fn in self._collectors:
+            for key, value in sorted(stats_fn().items()):
+                if isinstance(value, (int, float)):
+                    name = f"{prefix}_{key}"
+                    lines.append(f"# HELP {name} {documentation}: {key}")
+                    lines.append(f"# TYPE {name} gauge")
+                    lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "Total request latency", ("route", "method"))
+request_local_duration = registry.histogram(
+    "http_request_local_duration_seconds", "Request latency excluding time spent waiting on Jira", ("route", "method"))
+requests_total = registry.counter(
+    "http_requests_total", "Requests by status code", ("route", "method", "status"))
+request_bytes = registry.counter(
+    "http_request_bytes_total", "Request body bytes received", ("route",))
+response_bytes = registry.counter(
+    "http_response_bytes_total", "Response body bytes sent", ("route",))
+
+upstream_duration = registry.histogram(
+    "jira_upstream_duration_seconds", "Latency of each Jira call", ("endpoint", "method"))
+upstream_requests = registry.counter(
+    "jira_upstream_requests_total", "Jira calls by status code", ("endpoint", "method", "status"))
+upstream_bytes = registry.counter(
+    "jira_upstream_response_bytes_total", "Bytes received from Jira (Content-Length)", ("endpoint",))
+
+# Per-request accumulator of upstream time; contextvars follow the request's task
+_upstream_seconds: ContextVar[Optional[list]] = ContextVar("upstream_seconds", default=None)
+
+def observe_upstream(method: str, endpoint: str, status: str, seconds: float, content_length: int):
+    upstream_duration.observe(seconds, (endpoint, method))
+    upstream_requests.inc((endpoint, method, status))
+    if content_length:
+        upstream_bytes.inc((endpoint,), content_length)
+    accumulator = _upstream_seconds.get()
+    if accumulator is not None:
+        accumulator[0] += seconds
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware: per-route latency (total and local), status counts and body bytes.
+    Timing ends with the last body chunk, so streaming responses are measured in full.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        upstream = [0.0]
+        token = _upstream_seconds.set(upstream)
+        counts = {"in": 0, "out": 0, "status": 500}
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                counts["in"] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                counts["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                counts["out"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            _upstream_seconds.reset(token)
+            elapsed = time.perf_counter() - started
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            method = scope["method"]
+            request_duration.observe(elapsed, (route, method))
+            request_local_duration.observe(max(0.0, elapsed - upstream[0]), (route, method))
+            requests_total.inc((route, method, str(counts["status"])))
+            if counts["in"]:
+                request_bytes.inc((route,), counts["in"])
+            if counts["out"]:
+                response_bytes.inc((route,), counts["out"])
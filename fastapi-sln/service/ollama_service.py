@@ -1,55 +1,196 @@
-from typing import Dict, Any
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from datetime import datetime
-import ollama
+import httpx
+from services.cache import ExpiringLRU
+
+PRIORITIES = ("low", "medium", "high")
+TASK_FIELDS = """
+        - title
+        - due_date (ISO 8601, if specified)
+        - priority (low, medium or high, if implied)
+        - category (if implied)
+        - tags (list of strings, if implied)
+"""
 
 class LlamaService:
-    def __init__(self):
-        self.model = "llama3.2"
+    """
+    Async client for a local Ollama server (POST /api/generate).
+    Model calls are bounded by max_concurrency, identical prompts in flight share one
+    call, results are cached by content hash for cache_ttl seconds, and parse_tasks
+    parses up to batch_size lines per model call.
+    """
+    def __init__(self, model: str = "llama3.2", host: Optional[str] = None,
+                 max_concurrency: int = 4, batch_size: int = 20,
+                 cache_ttl: float = 3600, cache_size: int = 10000, timeout: float = 120.0):
+        self.model = model
+        self.host = (host or os.getenv("OLLAMA_HOST", "http://localhost:11434")).rstrip("/")
+        self.batch_size = batch_size
+        self.cache_ttl = cache_ttl
+        self.timeout = httpx.Timeout(timeout, connect=10.0)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._cache = ExpiringLRU(cache_size)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.host, timeout=self.timeout)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _generate(self, prompt: str) -> str:
+        async with self._semaphore:
+            response = await self.client.post("/api/generate", json={
+                "model": self.model,
+                "prompt": prompt,
+                "stream": False,
+                "format": "json",
+                "options": {"temperature": 0},
+            })
+        response.raise_for_status()
+        return response.json().get("response", "")
+
+    def _cache_key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{kind}\0{text}".encode()).hexdigest()
 
-    def parse_task(self, text: str) -> Dict[str, Any]:
+    async def _cached(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        # Cache hit, else join the identical call already in flight, else start one
+        result = self._cache.get(key)
+        if result is not None:
+            return result
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(compute())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        # shield: one caller disconnecting must not cancel the call the others are waiting on
+        return await asyncio.shield(future)
+
+    def _finish(self, key: str, future: asyncio.Future):
+        self._inflight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self._cache.put(key, future.result(), time.time() + self.cache_ttl)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(text.split())
+
+    async def parse_task(self, text: str) -> Dict[str, Any]:
         """
-        Parse natural language input into structured task data using Llama 2.
+        Parse natural language input into structured task data using Llama.
         Example input: "Buy groceries tomorrow at 5 PM"
         """
+        text = self._normalize(text)
         prompt = f"""
         Parse the following task description into structured data:
         "{text}"
-        
-        Return a JSON object with:
-        - title
-        - due_date (if specified)
-        - priority (if implied)
-        - category (if implied)
-        - tags (if implied)
-        """
-        
-        response = ollama.generate(model=self.model, prompt=prompt)
-        # Process the response and extract structured data
-        # This is a simplified example - actual implementation would need more robust parsing
-        parsed = self._process_llama_response(response)
-        return parsed
-
-    def _process_llama_response(self, response: str) -> Dict[str, Any]:
-        # Process the Llama response and convert it to structured data
-        # This is a placeholder implementation
+
+        Return a JSON object with:{TASK_FIELDS}"""
+
+        async def compute():
+            return self._process_llama_response(await self._generate(prompt), text)
+
+        parsed = await self._cached(self._cache_key("parse", text), compute)
+        return dict(parsed, tags=list(parsed["tags"]))
+
+    async def parse_tasks(self, lines: List[str]) -> List[Dict[str, Any]]:
+        """Parse many descriptions, batch_size lines per model call; cached lines are not re-sent."""
+        texts = [self._normalize(line) for line in lines]
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = []
+        for text in dict.fromkeys(texts):
+            cached = self._cache.get(self._cache_key("parse", text))
+            if cached is not None:
+                results[text] = cached
+            else:
+                pending.append(text)
+        chunks = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        for parsed in await asyncio.gather(*(self._parse_chunk(chunk) for chunk in chunks)):
+            results.update(parsed)
+        return [dict(results[text], tags=list(results[text]["tags"])) for text in texts]
+
+    async def _parse_chunk(self, texts: List[str]) -> Dict[str, Dict[str, Any]]:
+        if len(texts) == 1:
+            return {texts[0]: await self.parse_task(texts[0])}
+        numbered = "\n".join(f'{i}. "{text}"' for i, text in enumerate(texts, 1))
+        prompt = f"""
+        Parse each of the following numbered task descriptions into structured data:
+        {numbered}
+
+        Return a JSON object {{"tasks": [...]}} with exactly one object per description,
+        in the same order, each with:{TASK_FIELDS}"""
+        try:
+            items = json.loads(await self._generate(prompt)).get("tasks")
+        except (ValueError, AttributeError):
+            items = None
+        if not isinstance(items, list) or len(items) != len(texts):
+            # The model lost track of the list: fall back to one call per line
+            parsed = await asyncio.gather(*(self.parse_task(text) for text in texts))
+            return dict(zip(texts, parsed))
+        results = {}
+        expires_at = time.time() + self.cache_ttl
+        for text, item in zip(texts, items):
+            results[text] = self._normalize_task(item, text)
+            self._cache.put(self._cache_key("parse", text), results[text], expires_at)
+        return results
+
+    def _process_llama_response(self, response: str, text: str) -> Dict[str, Any]:
+        try:
+            data = json.loads(response)
+        except ValueError:
+            data = {}
+        return self._normalize_task(data, text)
+
+    def _normalize_task(self, data: Any, text: str) -> Dict[str, Any]:
+        # Model output is untrusted: keep only well-typed fields, defaulting the rest
+        if not isinstance(data, dict):
+            data = {}
+        due_date = None
+        if isinstance(data.get("due_date"), str):
+            try:
+                due_date = datetime.fromisoformat(data["due_date"])
+            except ValueError:
+                pass
+        tags = data.get("tags")
+        category = data.get("category")
         return {
-            "title": "Sample Task",
-            "due_date": datetime.now(),
-            "priority": "medium",
-            "category": None,
-            "tags": []
+            "title": data["title"] if isinstance(data.get("title"), str) and data["title"] else text,
+            "due_date": due_date,
+            "priority": self._extract_priority(data.get("priority")),
+            "category": category if isinstance(category, str) and category else None,
+            "tags": [tag for tag in tags if isinstance(tag, str)] if isinstance(tags, list) else [],
         }
 
-    def suggest_priority(self, task_description: str) -> str:
+    async def suggest_priority(self, task_description: str) -> str:
         """Use Llama to suggest task priority based on description"""
+        task_description = self._normalize(task_description)
         prompt = f"""
         Analyze this task and suggest a priority (low, medium, or high):
         "{task_description}"
+
+        Return a JSON object with a "priority" field.
         """
-        response = ollama.generate(model=self.model, prompt=prompt)
-        return self._extract_priority(response)
 
-    def _extract_priority(self, response: str) -> str:
-        # Process Llama response to extract priority
-        # This is a placeholder implementation
-        return "medium"
\ No newline at end of file
+        async def compute():
+            try:
+                data = json.loads(await self._generate(prompt))
+            except ValueError:
+                data = {}
+            return self._extract_priority(data.get("priority") if isinstance(data, dict) else None)
+
+        return await self._cached(self._cache_key("priority", task_description), compute)
+
+    def _extract_priority(self, value: Any) -> str:
+        value = value.lower().strip() if isinstance(value, str) else ""
+        return value if value in PRIORITIES else "medium"
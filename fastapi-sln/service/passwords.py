@@ -0,0 +1,82 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+import bcrypt
+
+# bcrypt cost factor (log2 rounds); changing it rehashes each password on its next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+
+def _secret(password: str) -> bytes:
+    # bcrypt reads at most 72 bytes; bcrypt>=5 raises instead of truncating, so truncate here
+    # exactly as earlier versions did and hashes made by them keep verifying
+    return password.encode("utf-8")[:72]
+
+def _cost(hashed: str) -> Optional[int]:
+    # "$2b$12$<22 salt + 31 digest chars>" -> 12; None for anything that isn't a bcrypt hash
+    parts = hashed.split("$")
+    if len(parts) != 4 or parts[0] or parts[1] not in ("2a", "2b", "2y") or not parts[2].isdigit() \
+            or len(parts[3]) != 53:
+        return None
+    return int(parts[2])
+
+@functools.lru_cache(maxsize=None)
+def _dummy_hash(rounds: int) -> bytes:
+    return bcrypt.hashpw(b"dummy password", bcrypt.gensalt(rounds))
+
+# Module-level so the process pool can pickle them by reference
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(rounds)).decode("ascii")
+
+def _verify_and_update(password: str, hashed: Optional[str], rounds: int) -> Tuple[bool, Optional[str]]:
+    if hashed is None:
+        # Unknown user: spend the same time as a real check so logins don't reveal which usernames exist
+        bcrypt.checkpw(_secret(password), _dummy_hash(rounds))
+        return False, None
+    cost = _cost(hashed)
+    if cost is None:
+        # Not a bcrypt hash (e.g. a legacy sha256 hex digest): it can't match. Errors from
+        # bcrypt itself are not caught, so a broken backend fails loudly instead of as a 401.
+        return False, None
+    if not bcrypt.checkpw(_secret(password), hashed.encode("ascii")):
+        return False, None
+    # Stored with another cost factor: hand back a hash at the current one
+    return True, _hash(password, rounds) if cost != rounds else None
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords in a process pool sized to the cores, so bcrypt
+    never runs on the event loop and logins scale past one core.
+    """
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, workers: Optional[int] = None):
+        self.rounds = rounds
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # Created on first use; spawn (not fork) because the server process already runs threads
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    async def hash(self, password: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(), _hash, password, self.rounds)
+
+    async def verify_and_update(self, password: str, hashed: Optional[str]) -> Tuple[bool, Optional[str]]:
+        # (valid, new_hash); new_hash is set when the stored hash used a different cost factor
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(), _verify_and_update,
+                                          password, hashed, self.rounds)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
@@ -0,0 +1,159 @@
+import asyncio
+import calendar
+import dataclasses
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional, Tuple
+from database.db_manager import DatabaseManager
+from database.executor import DatabaseExecutor
+
+logger = logging.getLogger(__name__)
+
+# Occurrence n of a series always gets id uuid5(OCCURRENCE_NAMESPACE, "<series_id>/<n>")
+OCCURRENCE_NAMESPACE = uuid.UUID("5ba64f95-65b3-4fea-8b82-b8fa5cb83f62")
+PERIODS = {"daily": timedelta(days=1), "weekly": timedelta(weeks=1)}
+
+def occurrence_due(anchor: datetime, recurrence: str, n: int) -> datetime:
+    # Due date of occurrence n of a series whose first task is due at anchor. Computed from
+    # the anchor, not the previous occurrence, so monthly series keep their day of the month
+    # (Jan 31 -> Feb 28 -> Mar 31) instead of drifting.
+    if recurrence == "monthly":
+        years, month = divmod(anchor.month - 1 + n, 12)
+        year = anchor.year + years
+        return anchor.replace(year=year, month=month + 1,
+                              day=min(anchor.day, calendar.monthrange(year, month + 1)[1]))
+    return anchor + PERIODS[recurrence] * n
+
+def _local(value: datetime) -> datetime:
+    # Schedule times are naive local time, like the clock; aware due dates are converted
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
+def first_occurrence_from(anchor: datetime, recurrence: str, moment: datetime) -> int:
+    # Smallest n >= 0 whose occurrence is due at or after moment (naive local time). Starts
+    # from an estimate at most one period early, so an old anchor costs a step or two, not
+    # one per missed period.
+    start = _local(anchor)
+    if recurrence == "monthly":
+        n = (moment.year - start.year) * 12 + moment.month - start.month
+    else:
+        n = (moment - start) // PERIODS[recurrence]
+    n = max(n - 1, 0)
+    while _local(occurrence_due(anchor, recurrence, n)) < moment:
+        n += 1
+    return n
+
+def _parse(value: Any) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+def _created(value: Any) -> datetime:
+    # tasks.created_at is SQLite's CURRENT_TIMESTAMP, which is UTC
+    created = _parse(value)
+    return _local(created if created.tzinfo else created.replace(tzinfo=timezone.utc))
+
+class ManualClock:
+    """Deterministic clock for tests: time only moves when advance() is called."""
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, delta: timedelta) -> datetime:
+        self.now += delta
+        return self.now
+
+class RecurrenceScheduler:
+    """
+    Creates the next occurrences of daily/weekly/monthly tasks ahead of their due dates.
+    A tick reads only the series heads due within lookahead (task_recurrences.next_due index)
+    and inserts their occurrences batch_size series per transaction, on the writer thread.
+    Occurrence ids are deterministic and inserted OR IGNORE, so overlapping ticks or several
+    worker processes never duplicate one. Occurrences due before a series' first task was
+    created are never made, and of those missed since (old anchor, downtime) only the latest
+    max_missed per series are; the rest are skipped. At most max_per_series occurrences are
+    made per series per transaction.
+    """
+    def __init__(self, db_manager: DatabaseManager, executor: Optional[DatabaseExecutor] = None,
+                 clock: Callable[[], datetime] = datetime.now, interval: float = 60.0,
+                 lookahead: timedelta = timedelta(days=1), batch_size: int = 1000,
+                 max_per_series: int = 100, max_missed: int = 1):
+        self.db_manager = db_manager
+        self.executor = executor or DatabaseExecutor()
+        self.clock = clock
+        self.interval = interval
+        self.lookahead = lookahead
+        self.batch_size = batch_size
+        self.max_per_series = max_per_series
+        self.max_missed = max_missed
+        self._task: Optional[asyncio.Task] = None
+
+    def materialize_batch(self, now: datetime) -> Tuple[int, bool]:
+        # One transaction, synchronously: (occurrences inserted, whether more may be due)
+        horizon = now + self.lookahead
+        heads = self.db_manager.recurrence_heads(horizon, self.batch_size)
+        occurrences, new_heads, finished = [], [], []
+        more = len(heads) == self.batch_size
+        for series_id, anchor_due, occurrence, head in heads:
+            try:
+                if series_id is None:
+                    # First time this head is seen: it is occurrence 0 of a new series, which
+                    # owes nothing due before the task was created
+                    series_id, anchor, occurrence = head.id, _parse(head.due_date), 0
+                    start = first_occurrence_from(anchor, head.recurrence, _created(head.created_at))
+                else:
+                    anchor = _parse(anchor_due)
+                    start = 0
+            except ValueError:
+                logger.warning("Task %s has an unreadable due date; not repeating it", head.id)
+                finished.append(head.id)
+                continue
+            task = head.to_task()
+            # Resume after the last occurrence made, skipping all but the latest max_missed past due
+            missed_from = first_occurrence_from(anchor, head.recurrence, now) - self.max_missed
+            head_id, n = head.id, max(occurrence + 1, start, missed_from)
+            occurrence = n - 1
+            due = occurrence_due(anchor, head.recurrence, n)
+            while _local(due) <= horizon and n - occurrence <= self.max_per_series:
+                successor = dataclasses.replace(
+                    task, id=str(uuid.uuid5(OCCURRENCE_NAMESPACE, f"{series_id}/{n}")),
+                    due_date=due, created_at=now, completed=False, subtasks=[])
+                occurrences.append(successor)
+                finished.append(head_id)
+                head_id, n = successor.id, n + 1
+                due = occurrence_due(anchor, head.recurrence, n)
+            # Capped with occurrences still due: the next batch continues this series
+            more = more or _local(due) <= horizon
+            new_heads.append((head_id, head.user_id, series_id, anchor, n - 1, _local(due)))
+        inserted = self.db_manager.apply_recurrences(occurrences, new_heads, finished)
+        return inserted, more
+
+    async def tick(self) -> int:
+        # Batches until nothing is due; other writes run between batches
+        now = self.clock()
+        total, more = 0, True
+        while more:
+            inserted, more = await self.executor.write(self.materialize_batch, now)
+            total += inserted
+        return total
+
+    async def run(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("Recurring task tick failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
@@ -1,16 +1,94 @@
-from typing import List, Optional
-from models.task import Task, TaskCreate
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+import uuid
+from models.task import (PRIORITY_POINTS, Task, TaskCreate, TaskBatchOperation, TaskBatchResult, TaskSearchHit,
+                         TaskChange, TaskChanges, TaskCounts, UserStats)
 from database.db_manager import DatabaseManager
+from database.executor import DatabaseExecutor
+from database.rows import TaskRow
 class TaskService:
-    def __init__(self, db_manager: DatabaseManager):
+    # Async facade for the routes: DatabaseManager calls run on the executor, never on the event loop
+    def __init__(self, db_manager: DatabaseManager, executor: Optional[DatabaseExecutor] = None):
         self.db_manager = db_manager
-    def create_task(self, user_id: str, task_data: TaskCreate) -> Task:
-        task = Task(**task_data.dict(), user_id=user_id)
-        self.db_manager.add_task(task)
+        self.executor = executor or DatabaseExecutor()
+    def _new_task(self, user_id: str, task_data: TaskCreate) -> Task:
+        return Task(
+            id=str(uuid.uuid4()),
+            created_at=datetime.now(),
+            completed=False,
+            user_id=user_id,
+            subtasks=[],
+            points=PRIORITY_POINTS[task_data.priority],
+            **task_data.model_dump(),
+        )
+    async def create_task(self, user_id: str, task_data: TaskCreate) -> Task:
+        task = self._new_task(user_id, task_data)
+        await self.executor.write(self.db_manager.add_task, task)
         return task
-    def get_user_tasks(self, user_id: str) -> List[Task]:
-        return self.db_manager.get_tasks(user_id)
-    def complete_task(self, task_id: str, user_id: str) -> bool:
-        return self.db_manager.mark_completed(task_id, user_id)
-    def delete_task(self, task_id: str, user_id: str) -> bool:
-        return self.db_manager.delete_task(task_id, user_id)
\ No newline at end of file
+    async def run_batch(self, user_id: str, operations: List[TaskBatchOperation]) -> List[TaskBatchResult]:
+        # Malformed items are reported as "invalid" and skipped; the rest run in one transaction
+        results: List[Optional[TaskBatchResult]] = []
+        pending = []
+        for operation in operations:
+            if operation.op == "create" and operation.task is not None:
+                task = self._new_task(user_id, operation.task)
+                pending.append((len(results), "create", task))
+                results.append(TaskBatchResult(op="create", task_id=task.id, status="created", task=task))
+            elif operation.op != "create" and operation.task_id:
+                pending.append((len(results), operation.op, operation.task_id))
+                results.append(None)
+            else:
+                results.append(TaskBatchResult(op=operation.op, task_id=operation.task_id, status="invalid"))
+        applied = await self.executor.write(self.db_manager.run_batch, user_id,
+                                            [(op, item) for _, op, item in pending])
+        done = {"complete": "completed", "delete": "deleted"}
+        for (index, op, item), ok in zip(pending, applied):
+            if op != "create":
+                results[index] = TaskBatchResult(op=op, task_id=item, status=done[op] if ok else "not_found")
+        return results
+    async def complete_tasks(self, user_id: str, task_ids: List[str]) -> List[TaskBatchResult]:
+        applied = await self.executor.write(self.db_manager.run_batch, user_id,
+                                            [("complete", task_id) for task_id in task_ids])
+        return [TaskBatchResult(op="complete", task_id=task_id, status="completed" if ok else "not_found")
+                for task_id, ok in zip(task_ids, applied)]
+    async def get_user_tasks(self, user_id: str) -> List[Task]:
+        return await self.executor.read(self.db_manager.get_tasks, user_id)
+    async def list_tasks(self, user_id: str, **filters) -> Tuple[List[Task], Optional[str]]:
+        return await self.executor.read(self.db_manager.list_tasks, user_id, **filters)
+    async def tag_counts(self, user_id: str, completed: Optional[bool] = None) -> List[Tuple[str, int]]:
+        return await self.executor.read(self.db_manager.tag_counts, user_id, completed)
+    async def search_tasks(self, user_id: str, query: str, limit: int = 20,
+                           offset: int = 0) -> Tuple[List[TaskSearchHit], bool]:
+        hits, more = await self.executor.read(self.db_manager.search_tasks, user_id, query, limit, offset)
+        return [TaskSearchHit(task=task, title=title, snippet=snippet, score=score)
+                for task, title, snippet, score in hits], more
+    async def change_seq(self, user_id: str) -> int:
+        return await self.executor.read(self.db_manager.change_seq, user_id)
+    async def changes_since(self, user_id: str, since: int, limit: int = 500) -> TaskChanges:
+        seq, changes, more = await self.executor.read(self.db_manager.changes_since, user_id, since, limit)
+        return TaskChanges(seq=seq, has_more=more, changes=[
+            TaskChange(seq=change_seq, task_id=task_id, deleted=task is None, task=task)
+            for change_seq, task_id, task in changes])
+    async def get_stats(self, user_id: str) -> UserStats:
+        rows, overdue = await self.executor.read(self.db_manager.task_stats, user_id, datetime.now())
+        overall = TaskCounts()
+        groups = {"priority": {}, "category": {}}
+        for dimension, value, total, completed, points, earned_points in rows:
+            counts = TaskCounts(total=total, completed=completed, points=points, earned_points=earned_points)
+            if dimension == "all":
+                overall = counts
+            else:
+                groups[dimension][value] = counts
+        return UserStats(total=overall.total, open=overall.total - overall.completed,
+                         completed=overall.completed, overdue=overdue,
+                         total_points=overall.points, earned_points=overall.earned_points,
+                         by_priority=groups["priority"], by_category=groups["category"])
+    def iter_tasks(self, user_id: str, **filters) -> Iterator[TaskRow]:
+        # Sync on purpose: StreamingResponse advances sync iterators in its own threadpool
+        return self.db_manager.iter_tasks(user_id, **filters)
+    async def get_task_tree(self, task_id: str, user_id: str, max_depth: int = 10) -> Optional[Task]:
+        return await self.executor.read(self.db_manager.get_task_tree, task_id, user_id, max_depth)
+    async def complete_task(self, task_id: str, user_id: str) -> bool:
+        return await self.executor.write(self.db_manager.mark_completed, task_id, user_id)
+    async def delete_task(self, task_id: str, user_id: str) -> bool:
+        return await self.executor.write(self.db_manager.delete_task, task_id, user_id)
\ No newline at end of file
@@ -1,17 +1,25 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime
 import uuid
-from models.task import Task, Priority, RecurrenceType
+from models.task import PRIORITY_POINTS, Task, Priority, RecurrenceType
 from database.db_manager import DatabaseManager
+from database.executor import DatabaseExecutor
 from services.ollama_service import LlamaService
-import sqlite3
 
 class TaskService:
-    def __init__(self, db_manager: DatabaseManager, llama_service: LlamaService):
+    def __init__(self, db_manager: DatabaseManager, llama_service: LlamaService,
+                 executor: Optional[DatabaseExecutor] = None):
         self.db_manager = db_manager
         self.llama_service = llama_service
+        # The async paths write through this instead of blocking the event loop
+        self.executor = executor or DatabaseExecutor()
 
-    def create_task(self, user_id: str, title: str, description: Optional[str] = None,
+    def create_task(self, user_id: str, title: str, **fields) -> Task:
+        task = self._new_task(user_id, title, **fields)
+        self.db_manager.add_task(task)
+        return task
+
+    def _new_task(self, user_id: str, title: str, description: Optional[str] = None,
                    priority: Priority = Priority.MEDIUM, due_date: Optional[datetime] = None,
                    tags: List[str] = None, category: Optional[str] = None,
                    recurrence: RecurrenceType = RecurrenceType.NONE,
@@ -32,74 +40,49 @@ class TaskService:
             subtasks=[],
             points=self._calculate_points(priority)
         )
-        self.db_manager.add_task(task)
         return task
 
-    def create_task_from_natural_language(self, user_id: str, text: str) -> Task:
+    async def create_task_from_natural_language(self, user_id: str, text: str) -> Task:
         # Use Llama service to parse natural language input
-        task_info = self.llama_service.parse_task(text)
-        return self.create_task(user_id=user_id, **task_info)
+        task_info = await self.llama_service.parse_task(text)
+        task = self._new_task(user_id, **dict(task_info, priority=Priority(task_info["priority"])))
+        await self.executor.write(self.db_manager.add_task, task)
+        return task
 
-    def _calculate_points(self, priority: str) -> int:
-        points_map = {
-            'high': 10,
-            'medium': 5,  
-            'low': 2
-        }
-        return points_map.get(priority.lower(), 2)
+    async def create_tasks_from_natural_language(self, user_id: str, lines: List[str]) -> List[Task]:
+        # One model call per LlamaService.batch_size lines instead of one per line,
+        # and one transaction for all of the resulting tasks
+        parsed = await self.llama_service.parse_tasks(lines)
+        tasks = [self._new_task(user_id, **dict(task_info, priority=Priority(task_info["priority"])))
+                 for task_info in parsed]
+        await self.executor.write(self.db_manager.run_batch, user_id, [("create", task) for task in tasks])
+        return tasks
+
+    def _calculate_points(self, priority: Union[Priority, str]) -> int:
+        if not isinstance(priority, Priority):
+            try:
+                priority = Priority(priority.lower())
+            except ValueError:
+                priority = Priority.LOW
+        return PRIORITY_POINTS[priority]
 
     def get_user_tasks(self, user_id: str) -> List[Task]:
         return self.db_manager.get_tasks(user_id)
 
     def mark_completed(self, task_id: str, user_id: str) -> bool:
-        with sqlite3.connect(self.db_manager.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE tasks 
-                SET completed = TRUE 
-                WHERE id = ? AND user_id = ?
-            """, (task_id, user_id))
-            return cursor.rowcount > 0
+        return self.db_manager.mark_completed(task_id, user_id)
 
-def update_task(self, task_id: str, user_id: str, **updates) -> Optional[Task]:
-    allowed_fields = {'title', 'description', 'priority', 'due_date', 
-                     'tags', 'category', 'recurrence', 'points'}
-    
-    # Filter out invalid fields
-    valid_updates = {k: v for k, v in updates.items() if k in allowed_fields}
-    
-    if not valid_updates:
-        return None
-    
-    # Build the update query
-    set_clause = ', '.join(f"{k} = ?" for k in valid_updates.keys())
-    values = list(valid_updates.values())
-    values.extend([task_id, user_id])  # Add WHERE clause parameters
-    
-    with sqlite3.connect(self.db_manager.db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute(f"""
-            UPDATE tasks 
-            SET {set_clause}
-            WHERE id = ? AND user_id = ?
-            RETURNING *
-        """, values)
+    def update_task(self, task_id: str, user_id: str, **updates) -> Optional[Task]:
+        allowed_fields = {'title', 'description', 'priority', 'due_date', 
+                         'tags', 'category', 'recurrence', 'points'}
         
-        row = cursor.fetchone()
-        return self.db_manager._row_to_task(row) if row else None
-
-def delete_task(self, task_id: str, user_id: str) -> bool:
-    with sqlite3.connect(self.db_manager.db_path) as conn:
-        cursor = conn.cursor()
-        # First delete any subtasks
-        cursor.execute("""
-            DELETE FROM tasks 
-            WHERE parent_task_id = ? AND user_id = ?
-        """, (task_id, user_id))
+        # Filter out invalid fields
+        valid_updates = {k: v for k, v in updates.items() if k in allowed_fields}
         
-        # Then delete the main task
-        cursor.execute("""
-            DELETE FROM tasks 
-            WHERE id = ? AND user_id = ?
-        """, (task_id, user_id))
-        return cursor.rowcount > 0
\ No newline at end of file
+        if not valid_updates:
+            return None
+        
+        return self.db_manager.update_task(task_id, user_id, valid_updates)
+
+    def delete_task(self, task_id: str, user_id: str) -> bool:
+        return self.db_manager.delete_task(task_id, user_id)
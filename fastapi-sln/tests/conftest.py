@@ -0,0 +1,16 @@
+import importlib
+import sys
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+# The app imports the service/ directory as the "services" package (see main.py)
+sys.modules.setdefault("services", importlib.import_module("service"))
+
+from database.db_manager import DatabaseManager
+
+@pytest.fixture
+def db_manager(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "todo.db"))
+    yield manager
+    manager.close()
@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from database.db_manager import ChangeLogExpired
+from database.rows import iter_json_snapshot
+from models.task import Priority, RecurrenceType, Task, TaskChanges
+from service.changelog import ChangeLogPruner
+
+def make_task(task_id: str) -> Task:
+    return Task(id=task_id, title=task_id, description=None, priority=Priority.LOW, due_date=None,
+                created_at=datetime(2024, 1, 1), tags=[], category=None, completed=False,
+                user_id="u1", recurrence=RecurrenceType.NONE, parent_task_id=None, subtasks=[])
+
+def sync(db_manager, since=0, limit=2):
+    changes = []
+    while True:
+        since, page, more = db_manager.changes_since("u1", since, limit)
+        changes += [(task_id, task is None) for _, task_id, task in page]
+        if not more:
+            return since, changes
+
+def log_rows(db_manager):
+    with db_manager.connection() as conn:
+        return conn.execute("SELECT task_id, op FROM task_changes ORDER BY seq").fetchall()
+
+@pytest.fixture
+def history(db_manager):
+    db_manager.run_batch("u1", [("create", make_task(f"t{i}")) for i in range(5)])
+    db_manager.run_batch("u1", [("complete", "t0"), ("delete", "t1"), ("complete", "t3")])
+    return db_manager
+
+def test_sync_returns_each_task_once_at_its_latest_change(history):
+    seq, changes = sync(history)
+    assert seq == 8
+    assert changes == [("t2", False), ("t4", False), ("t0", False), ("t1", True), ("t3", False)]
+    assert sync(history, since=6) == (8, [("t1", True), ("t3", False)])
+
+def test_superseded_changes_are_compacted(history):
+    assert log_rows(history) == [("t2", "insert"), ("t4", "insert"), ("t0", "update"),
+                                 ("t1", "delete"), ("t3", "update")]
+
+def test_pruned_tombstones_force_a_full_resync(history):
+    with history.connection() as conn:
+        conn.execute("UPDATE task_changes SET changed_at = '2020-01-01 00:00:00' WHERE op = 'delete'")
+    pruner = ChangeLogPruner(history, clock=lambda: datetime(2024, 1, 1), retention=timedelta(days=30))
+    try:
+        assert asyncio.run(pruner.tick()) == 1
+    finally:
+        pruner.executor.shutdown()
+    assert ("t1", "delete") not in log_rows(history)
+    # A client that may have seen t1 before seq 7 can no longer learn of its deletion
+    for since in (0, 5):
+        with pytest.raises(ChangeLogExpired):
+            history.changes_since("u1", since)
+    assert sync(history, since=7) == (8, [("t3", False)])
+
+def test_full_sync_snapshot_lists_current_tasks(history):
+    body = b"".join(iter_json_snapshot(8, history.iter_tasks("u1"), batch_size=2))
+    snapshot = TaskChanges.model_validate_json(body)
+    assert (snapshot.seq, snapshot.has_more) == (8, False)
+    assert [(change.task_id, change.deleted, change.task.completed) for change in snapshot.changes] == [
+        ("t0", False, True), ("t2", False, False), ("t3", False, True), ("t4", False, False)]
@@ -0,0 +1,63 @@
+import asyncio
+import httpx
+import pytest
+from services.jira_service import JiraError, JiraService
+
+def run(handler, call):
+    async def main():
+        service = JiraService(max_retries=2, backoff_factor=0)
+        service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await call(service)
+        finally:
+            await service.aclose()
+    return asyncio.run(main())
+
+def search(service):
+    return service.search("jira.example.com", "me@example.com", "token", "project = ABC")
+
+def create(service):
+    return service.create_issue("jira.example.com", "me@example.com", "token", "abc", "10001", "Title")
+
+def test_search_retries_transport_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.RemoteProtocolError("server disconnected", request=request)
+        return httpx.Response(200, json={"issues": [{"key": "ABC-1", "fields": {"summary": "x"}}], "total": 1})
+
+    result = run(handler, search)
+    assert len(calls) == 2
+    assert [issue["key"] for issue in result["issues"]] == ["ABC-1"]
+
+@pytest.mark.parametrize("call", [search, create])
+def test_persistent_transport_error_is_a_bad_gateway(call):
+    def handler(request):
+        raise httpx.ReadError("connection reset", request=request)
+
+    with pytest.raises(JiraError) as error:
+        run(handler, call)
+    assert error.value.status_code == 502
+
+def test_create_is_not_retried_after_a_transport_error():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ReadError("connection reset", request=request)
+
+    with pytest.raises(JiraError):
+        run(handler, create)
+    assert len(calls) == 1
+
+@pytest.mark.parametrize("call", [search, create])
+@pytest.mark.parametrize("body", [b"<html>Sign in</html>", b"[]"])
+def test_non_json_success_body_is_a_bad_gateway(call, body):
+    def handler(request):
+        return httpx.Response(200, content=body, headers={"Content-Type": "text/html"})
+
+    with pytest.raises(JiraError) as error:
+        run(handler, call)
+    assert error.value.status_code == 502
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+from services.ollama_service import LlamaService
+from services.task_service import TaskService
+
+NUMBERED = re.compile(r'^\s*\d+\. "(.*)"$', re.MULTILINE)
+QUOTED = re.compile(r'"(.*)"')
+
+class FakeOllama(ThreadingHTTPServer):
+    """Answers POST /api/generate like Ollama, deriving each task from its quoted description."""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeOllamaHandler)
+        self.prompts = []
+        self.delay = 0.0
+        self.broken_batches = False
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def answer(self, prompt: str) -> dict:
+        self.prompts.append(prompt)
+        time.sleep(self.delay)
+        if "suggest a priority" in prompt:
+            return {"priority": "high" if "urgent" in prompt else "low"}
+        texts = NUMBERED.findall(prompt)
+        if texts:
+            if self.broken_batches:
+                texts = texts[:-1]
+            return {"tasks": [self.task(text) for text in texts]}
+        return self.task(QUOTED.search(prompt).group(1))
+
+    @staticmethod
+    def task(text: str) -> dict:
+        return {"title": text.title(), "priority": "high" if "urgent" in text else "low", "tags": ["fake"]}
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        payload = json.dumps({"response": json.dumps(self.server.answer(body["prompt"]))}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def ollama():
+    server = FakeOllama()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def run(ollama, body, **options):
+    async def main():
+        llama = LlamaService(host=ollama.url, **options)
+        try:
+            return await body(llama)
+        finally:
+            await llama.aclose()
+    return asyncio.run(main())
+
+def test_parse_task_coalesces_and_caches_identical_prompts(ollama):
+    ollama.delay = 0.2
+
+    async def body(llama):
+        first = await asyncio.gather(*(llama.parse_task("buy  milk") for _ in range(5)))
+        again = await llama.parse_task("buy milk")
+        return first, again
+
+    first, again = run(ollama, body)
+    assert len(ollama.prompts) == 1
+    assert all(result["title"] == "Buy Milk" for result in first)
+    assert again == first[0]
+
+def test_parse_tasks_batches_lines_and_skips_cached_ones(ollama):
+    lines = [f"task {i}" for i in range(5)]
+
+    async def body(llama):
+        await llama.parse_task("task 0")
+        return await llama.parse_tasks(lines + ["task 1"])
+
+    parsed = run(ollama, body, batch_size=2)
+    # one single-line call, then task 1..4 in two batches of two
+    assert len(ollama.prompts) == 3
+    assert [task["title"] for task in parsed] == [f"Task {i}" for i in range(5)] + ["Task 1"]
+
+def test_parse_tasks_falls_back_to_one_call_per_line(ollama):
+    ollama.broken_batches = True
+    parsed = run(ollama, lambda llama: llama.parse_tasks(["a", "b", "c"]))
+    assert len(ollama.prompts) == 4
+    assert [task["title"] for task in parsed] == ["A", "B", "C"]
+
+def test_suggest_priority(ollama):
+    assert run(ollama, lambda llama: llama.suggest_priority("urgent: file taxes")) == "high"
+    assert run(ollama, lambda llama: llama.suggest_priority("water plants")) == "low"
+
+def test_natural_language_tasks_are_stored_with_points(ollama, db_manager):
+    async def body(llama):
+        service = TaskService(db_manager, llama)
+        try:
+            one = await service.create_task_from_natural_language("u1", "urgent report")
+            many = await service.create_tasks_from_natural_language("u1", ["urgent call", "tidy desk"])
+        finally:
+            service.executor.shutdown()
+        return [one, *many]
+
+    created = run(ollama, body)
+    assert [(task.title, task.points) for task in created] == [
+        ("Urgent Report", 10), ("Urgent Call", 10), ("Tidy Desk", 2)]
+    stored = {task.id: task for task in db_manager.get_tasks("u1")}
+    assert sorted(stored) == sorted(task.id for task in created)
+    assert all(stored[task.id].points == task.points for task in created)
@@ -0,0 +1,16 @@
+import pytest
+from database.db_manager import SORT_EXPRESSIONS
+
+def test_hot_queries_use_indexes(db_manager):
+    assert db_manager.unindexed_queries() == {}
+
+@pytest.mark.parametrize("sort", SORT_EXPRESSIONS)
+@pytest.mark.parametrize("descending", [False, True])
+def test_list_tasks_sorts_without_temp_btree(db_manager, sort, descending):
+    # First and later pages of every supported sort walk an index in order
+    queries = {name: query for name, query in db_manager.hot_queries().items()
+               if name.startswith(f"list_tasks:{sort}:{'desc' if descending else 'asc'}:")}
+    assert len(queries) == 3
+    for name, (sql, params) in queries.items():
+        plan = db_manager.explain(sql, params)
+        assert not any("TEMP B-TREE" in step for step in plan), (name, plan)
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from models.task import Priority, RecurrenceType, Task
+from service.scheduler import ManualClock, RecurrenceScheduler, first_occurrence_from
+
+def add_daily(db_manager, due: datetime, created_at: datetime):
+    db_manager.add_task(Task(id="head", title="stand-up", description=None, priority=Priority.LOW,
+                             due_date=due, created_at=created_at, tags=[], category=None,
+                             completed=False, user_id="u1", recurrence=RecurrenceType.DAILY,
+                             parent_task_id=None, subtasks=[]))
+    # The database stamps created_at itself (UTC); backdate it to the local time given
+    stamp = created_at.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    with db_manager.connection() as conn:
+        conn.execute("UPDATE tasks SET created_at = ? WHERE id = 'head'", (stamp,))
+
+@pytest.fixture
+def scheduler(db_manager):
+    clock = ManualClock(datetime(2026, 1, 10, 12, 0))
+    scheduler = RecurrenceScheduler(db_manager, clock=clock)
+    yield scheduler
+    scheduler.executor.shutdown()
+
+def due_dates(db_manager):
+    return sorted(str(task.due_date) for task in db_manager.get_tasks("u1"))
+
+def test_old_anchor_makes_only_the_latest_missed_and_upcoming_occurrences(scheduler, db_manager):
+    add_daily(db_manager, datetime(2020, 1, 1, 9, 0), datetime(2020, 1, 1))
+    assert asyncio.run(scheduler.tick()) == 2
+    assert due_dates(db_manager) == ["2020-01-01 09:00:00", "2026-01-10 09:00:00", "2026-01-11 09:00:00"]
+    assert asyncio.run(scheduler.tick()) == 0
+    scheduler.clock.advance(timedelta(days=1))
+    assert asyncio.run(scheduler.tick()) == 1
+    assert due_dates(db_manager)[-1] == "2026-01-12 09:00:00"
+
+def test_series_owes_nothing_due_before_it_was_created(scheduler, db_manager):
+    scheduler.max_missed = 100
+    add_daily(db_manager, datetime(2020, 1, 1, 9, 0), datetime(2026, 1, 8, 12, 0))
+    assert asyncio.run(scheduler.tick()) == 3
+    assert due_dates(db_manager)[1:] == ["2026-01-09 09:00:00", "2026-01-10 09:00:00", "2026-01-11 09:00:00"]
+
+def test_downtime_skips_all_but_the_latest_missed_occurrence(scheduler, db_manager):
+    add_daily(db_manager, datetime(2026, 1, 10, 9, 0), datetime(2026, 1, 9))
+    assert asyncio.run(scheduler.tick()) == 1
+    scheduler.clock.advance(timedelta(days=30))
+    assert asyncio.run(scheduler.tick()) == 2
+    assert due_dates(db_manager)[-2:] == ["2026-02-09 09:00:00", "2026-02-10 09:00:00"]
+
+def test_first_occurrence_from():
+    anchor = datetime(2024, 1, 31, 9, 0)
+    assert first_occurrence_from(anchor, "daily", datetime(2020, 1, 1)) == 0
+    assert first_occurrence_from(anchor, "daily", datetime(2024, 2, 1, 9, 0)) == 1
+    assert first_occurrence_from(anchor, "weekly", datetime(2024, 2, 1)) == 1
+    # Feb 29 09:00 is occurrence 1; Feb 29 10:00 is past it
+    assert first_occurrence_from(anchor, "monthly", datetime(2024, 2, 29, 9, 0)) == 1
+    assert first_occurrence_from(anchor, "monthly", datetime(2024, 2, 29, 10, 0)) == 2
@@ -0,0 +1,26 @@
+from datetime import datetime
+from models.task import Priority, RecurrenceType, Task
+
+def make_task(task_id: str, title: str, description: str = None) -> Task:
+    return Task(id=task_id, title=title, description=description, priority=Priority.MEDIUM,
+                due_date=None, created_at=datetime(2024, 1, 1), tags=[], category=None,
+                completed=False, user_id="u1", recurrence=RecurrenceType.NONE,
+                parent_task_id=None, subtasks=[])
+
+def test_search_highlights_are_escaped_html(db_manager):
+    db_manager.add_task(make_task("t1", "<script>alert(1)</script> report",
+                                  'fix the report & <img src=x onerror="alert(2)">'))
+    hits, more = db_manager.search_tasks("u1", "report")
+    assert not more
+    [(task, title, snippet, score)] = hits
+    assert task.title == "<script>alert(1)</script> report"
+    assert title == "&lt;script&gt;alert(1)&lt;/script&gt; <mark>report</mark>"
+    assert snippet == ("fix the <mark>report</mark> &amp; &lt;img src=x "
+                       "onerror=&quot;alert(2)&quot;&gt;")
+    assert score > 0
+
+def test_search_without_description_has_no_snippet(db_manager):
+    db_manager.add_task(make_task("t1", "quarterly report"))
+    [(_, title, snippet, _)], _ = db_manager.search_tasks("u1", "quarterly")
+    assert title == "<mark>quarterly</mark> report"
+    assert snippet is None
@@ -0,0 +1,54 @@
+import asyncio
+from database import db_manager as db_manager_module
+from database.db_manager import DatabaseManager
+from models.task import Priority, TaskBatchOperation, TaskCreate
+from service.task import TaskService
+
+def get_stats(db_manager, user_id="u1"):
+    service = TaskService(db_manager)
+    try:
+        return asyncio.run(service.get_stats(user_id))
+    finally:
+        service.executor.shutdown()
+
+def test_created_tasks_are_worth_their_priority_points(db_manager):
+    service = TaskService(db_manager)
+
+    async def create():
+        high = await service.create_task("u1", TaskCreate(title="ship", priority=Priority.HIGH))
+        await service.create_task("u1", TaskCreate(title="review", priority=Priority.MEDIUM))
+        await service.create_task("u1", TaskCreate(title="tidy", priority=Priority.LOW))
+        await service.run_batch("u1", [TaskBatchOperation(op="complete", task_id=high.id)])
+
+    try:
+        asyncio.run(create())
+    finally:
+        service.executor.shutdown()
+    stats = get_stats(db_manager)
+    assert (stats.total_points, stats.earned_points) == (17, 10)
+    assert stats.by_priority["high"].points == 10
+
+def test_migration_backfills_points_and_stats(tmp_path, monkeypatch):
+    path = str(tmp_path / "old.db")
+    # A database at schema version 8
+    monkeypatch.setattr(db_manager_module, "MIGRATIONS", db_manager_module.MIGRATIONS[:8])
+    manager = DatabaseManager(path)
+    service = TaskService(manager)
+    try:
+        asyncio.run(service.create_task("u1", TaskCreate(title="ship", priority=Priority.HIGH)))
+        asyncio.run(service.create_task("u1", TaskCreate(title="plan", priority=Priority.LOW)))
+    finally:
+        service.executor.shutdown()
+    # As written before tasks were given points: 0 points, stats to match; "plan" has its own
+    with manager.connection() as conn:
+        conn.execute("UPDATE tasks SET points = CASE title WHEN 'plan' THEN 7 ELSE 0 END")
+    seq = manager.change_seq("u1")
+    manager.close()
+    monkeypatch.undo()
+    manager = DatabaseManager(path)
+    try:
+        assert get_stats(manager).total_points == 17
+        # Only the backfilled task is logged as changed
+        assert manager.change_seq("u1") == seq + 1
+    finally:
+        manager.close()
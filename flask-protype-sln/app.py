@@ -1,16 +1,36 @@
 # app.py
 import os
+import csv
+import io
+import threading
 import requests
 from flask import (Flask, render_template, request, jsonify, session,
-                   redirect, url_for, flash)
+                   redirect, url_for, flash, Response, stream_with_context)
 from dotenv import load_dotenv
-from requests.auth import HTTPBasicAuth
 from functools import wraps # Para o decorator @login_required
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+
+from jira_client import JiraClientPool, normalize_base_url
+from credential_cache import CredentialCache
+from field_projection import projection_from_request
+import json_backend
+from json_backend import FastJSONProvider, loads_response
+import metrics
+from session_store import (ServerSideSessionInterface, MemorySessionBackend,
+                           SQLiteSessionBackend)
+from search_cache import (SearchCache, RedisBackend, credential_scope,
+                          projects_in_jql)
 
 # Carrega variáveis de ambiente do arquivo .env (para FLASK_SECRET_KEY)
 load_dotenv()
 
 app = Flask(__name__)
+# jsonify/request.get_json usam orjson/ujson quando disponíveis (ver json_backend)
+app.json = FastJSONProvider(app)
+app.json.sort_keys = False
+# Latência por rota (total e sem o tempo do Jira), status e bytes; exposto em /metrics
+metrics.init_app(app)
 app.secret_key = os.getenv('FLASK_SECRET_KEY')
 
 # Validação da chave secreta
@@ -19,6 +39,55 @@ if not app.secret_key:
     print("A aplicação não funcionará corretamente sem uma chave secreta.")
     # Em produção, você pode querer sair aqui: import sys; sys.exit(1)
 
+# Sessão no servidor: o cookie leva só um id opaco e o API Token nunca vai para o navegador.
+# SESSION_BACKEND=memory (padrão, um processo) | sqlite (vários workers) | cookie (sessão assinada do Flask)
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'memory').lower()
+if SESSION_BACKEND == 'sqlite':
+    app.session_interface = ServerSideSessionInterface(SQLiteSessionBackend(
+        os.getenv('SESSION_SQLITE_PATH', 'sessions.db'),
+        cache_ttl=float(os.getenv('SESSION_CACHE_TTL', 5))))
+elif SESSION_BACKEND == 'memory':
+    app.session_interface = ServerSideSessionInterface(MemorySessionBackend(
+        max_entries=int(os.getenv('SESSION_MAX_ENTRIES', 10000)),
+        max_anonymous=int(os.getenv('SESSION_MAX_ANONYMOUS', 1000))))
+
+# Pool de clientes HTTP do Jira compartilhado entre as rotas (keep-alive por credencial)
+jira_pool = JiraClientPool(
+    pool_maxsize=int(os.getenv('JIRA_POOL_MAXSIZE', 10)),
+    max_clients=int(os.getenv('JIRA_POOL_MAX_CLIENTS', 128)),
+    timeout=float(os.getenv('JIRA_HTTP_TIMEOUT', 30)),
+    max_retries=int(os.getenv('JIRA_HTTP_MAX_RETRIES', 3)),
+    backoff_factor=float(os.getenv('JIRA_HTTP_BACKOFF', 0.5)),
+    observer=metrics.observe_upstream,
+)
+
+# Cache das verificações de login (/myself): positivas por CREDENTIAL_CACHE_TTL segundos,
+# falhas de autenticação bloqueiam novas tentativas com backoff de até CREDENTIAL_BLOCK_MAX
+credential_cache = CredentialCache(
+    ttl=float(os.getenv('CREDENTIAL_CACHE_TTL', 300)),
+    negative_max=float(os.getenv('CREDENTIAL_BLOCK_MAX', 60)),
+)
+
+# Paginação da busca: tamanho de página pedido ao Jira e páginas buscadas em paralelo no modo stream
+SEARCH_PAGE_SIZE = int(os.getenv('JIRA_SEARCH_PAGE_SIZE', 100))
+SEARCH_CONCURRENCY = int(os.getenv('JIRA_SEARCH_CONCURRENCY', 4))
+
+# Criação em lote: issues por chamada /issue/bulk (limite do Jira) e chamadas simultâneas
+BULK_CHUNK_SIZE = 50
+BULK_CONCURRENCY = int(os.getenv('JIRA_BULK_CONCURRENCY', 4))
+BULK_MAX_ISSUES = int(os.getenv('JIRA_BULK_MAX_ISSUES', 1000))
+
+# Cache de resultados de busca (LRU + TTL), isolado por credencial.
+# SEARCH_CACHE_REDIS_URL habilita um segundo nível compartilhado entre processos.
+search_cache = SearchCache(
+    max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 256)),
+    max_bytes=int(os.getenv('SEARCH_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+    ttl=float(os.getenv('SEARCH_CACHE_TTL', 60)),
+    backend=RedisBackend(os.getenv('SEARCH_CACHE_REDIS_URL')) if os.getenv('SEARCH_CACHE_REDIS_URL') else None,
+    # Com backend: intervalo máximo para uma invalidação de outro processo valer neste
+    recheck_interval=float(os.getenv('SEARCH_CACHE_RECHECK_INTERVAL', 1)),
+)
+
 
 # --- Autenticação e Funções Auxiliares ---
 
@@ -28,22 +97,33 @@ def verify_jira_credentials(jira_instance, email, api_token):
         return False, "Instância, Email e API Token são obrigatórios."
 
     # Garante que a URL base esteja formatada corretamente
-    base_url = jira_instance.strip()
-    if not base_url.startswith(('http://', 'https://')):
-        base_url = f"https://{base_url}"
-    base_url = base_url.rstrip('/')
+    base_url = normalize_base_url(jira_instance)
+
+    # Verificação recente (ou falha recente) em cache evita a chamada ao Jira
+    cached = credential_cache.lookup(base_url, email, api_token)
+    if cached is not None:
+        return cached
+
+    # Session fora do pool: só entra nele se a credencial for válida
+    client = jira_pool.new_client(base_url, email, api_token)
+    verified, result = check_myself(client, base_url, email, api_token)
+    if verified:
+        jira_pool.adopt(client, email, api_token)
+    else:
+        client.session.close()
+    return verified, result
 
-    # Endpoint de teste para verificar autenticação
-    verify_url = f"{base_url}/rest/api/3/myself"
-    auth = HTTPBasicAuth(email, api_token)
-    headers = {"Accept": "application/json"}
 
+def check_myself(client, base_url, email, api_token):
+    """Chama /myself com o client informado. Retorna (True, base_url) ou (False, mensagem)."""
     try:
-        response = requests.get(verify_url, headers=headers, auth=auth, timeout=15)
+        # Endpoint de teste para verificar autenticação
+        response = client.get("/rest/api/3/myself", timeout=15)
         response.raise_for_status() # Lança erro para 4xx/5xx
         # Se chegou aqui, a autenticação funcionou
         user_data = response.json()
         print(f"Login verificado com sucesso para: {user_data.get('displayName', email)}")
+        credential_cache.record_success(base_url, email, api_token)
         return True, base_url # Retorna True e a URL base formatada
     except requests.exceptions.HTTPError as http_err:
         status_code = http_err.response.status_code
@@ -61,6 +141,9 @@ def verify_jira_credentials(jira_instance, email, api_token):
             except ValueError:
                  error_msg += f" Resposta: {http_err.response.text[:100]}..." # Mostra início da resposta se não for JSON
         print(f"Falha na verificação: {error_msg}")
+        if status_code in (401, 403):
+            # Só falhas de autenticação entram no cache negativo (não erros de rede)
+            credential_cache.record_failure(base_url, email, error_msg)
         return False, error_msg
     except requests.exceptions.ConnectionError:
         error_msg = f"Não foi possível conectar à instância: {base_url}. Verifique a URL e a rede."
@@ -86,6 +169,140 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+EXPIRED_TOKEN_ERROR = "Sua sessão expirou ou o API Token tornou-se inválido. Faça login novamente."
+
+
+def forget_credentials(jira_instance_url, email, api_token):
+    """O Jira recusou o token (401): descarta caches e sessão."""
+    jira_pool.discard(jira_instance_url, email, api_token)
+    credential_cache.forget(jira_instance_url, email, api_token)
+    session.clear()
+
+
+def expired_token_response(jira_instance_url, email, api_token):
+    """Descarta as credenciais recusadas e pede novo login."""
+    forget_credentials(jira_instance_url, email, api_token)
+    return jsonify({"error": EXPIRED_TOKEN_ERROR, "redirect": url_for('login')}), 401
+
+
+def build_adf_description(description_text):
+    """Converte texto simples no formato ADF (Atlassian Document Format) exigido pela API v3."""
+    return {
+        "type": "doc", "version": 1,
+        "content": [{"type": "paragraph", "content": [{"type": "text", "text": description_text or " "}]}]
+    }
+
+
+def build_issue_payload(project_key, issue_type_id, summary, description_text):
+    """Monta o payload de criação de issue (usado na criação individual e em lote)."""
+    return {
+        "fields": {
+            "project": {"key": project_key.upper()},
+            "issuetype": {"id": issue_type_id},
+            "summary": summary,
+            "description": build_adf_description(description_text)
+        }
+    }
+
+
+def jira_error_message(response):
+    """Extrai errorMessages/errors de uma resposta de erro do Jira."""
+    try:
+        error_details = response.json()
+        return f"Erro do Jira ({response.status_code}): {error_details.get('errorMessages', [])} {error_details.get('errors', {})}"
+    except ValueError:
+        return f"Erro HTTP ({response.status_code}): {response.text}"
+
+
+def int_field(data, name, default):
+    """Lê um campo inteiro do corpo JSON: número ou texto numérico (ex.: "50"); ausente/null usa o padrão."""
+    value = data.get(name)
+    if value is None:
+        return default
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    raise ValueError(f"O campo '{name}' deve ser um número inteiro.")
+
+
+def search_error_message(http_err):
+    """Monta a mensagem de erro de uma busca a partir do HTTPError do Jira. Retorna (mensagem, detalhes)."""
+    status_code = http_err.response.status_code
+    error_message = f"Erro na busca ({status_code})"
+    details = ""
+    try:
+        # Tenta pegar a mensagem de erro específica do Jira (útil para JQL inválido)
+        error_details = http_err.response.json()
+        jira_errors = error_details.get('errorMessages', [])
+        if jira_errors:
+             error_message += f": {', '.join(jira_errors)}"
+             details = ', '.join(jira_errors) # Guarda detalhes para possível uso no JS
+        # Adiciona erros de campos específicos se houver (raro em busca, mas possível)
+        field_errors = error_details.get('errors', {})
+        if field_errors:
+             error_message += f" Errors: {field_errors}"
+
+    except ValueError: # Se a resposta de erro não for JSON
+        error_message += f": {http_err.response.text[:200]}..." # Limita tamanho
+    return error_message, details
+
+
+def stream_search_results(client, jql_query, first_page, projection, jira_instance_url, cache_entry=None):
+    """Gera a busca completa como NDJSON: uma linha 'meta', uma linha 'issues' por página e 'end'.
+
+    Apenas uma janela de páginas fica em memória; o navegador renderiza a primeira
+    página antes de a última ser buscada. As páginas seguintes são lidas em stream
+    (JiraClient.iter_search_issues) e só as issues já projetadas são guardadas. Com `cache_entry` (dict com key/scope/projects)
+    o resultado é guardado no search_cache ao final, se couber no limite por entrada.
+    """
+    total = first_page.get('total', 0)
+    yield json_backend.dumps({"type": "meta", "total": total}) + "\n"
+    count = 0
+    cached_issues, cached_bytes = ([], 0) if cache_entry else (None, 0)
+    try:
+        pages = client.iter_search_pages(jql_query, first_page, fields=projection.jira_fields,
+                                         expand=projection.jira_expand, concurrency=SEARCH_CONCURRENCY,
+                                         extract=lambda issue: projection.extract(issue, jira_instance_url))
+        first_issues = projection.extract_all(first_page.get('issues', []), jira_instance_url)
+        for issues in chain([first_issues], (page['issues'] for page in pages)):
+            count += len(issues)
+            line = json_backend.dumps({"type": "issues", "issues": issues}) + "\n"
+            if cached_issues is not None:
+                cached_bytes += len(line)
+                if cached_bytes > search_cache.max_entry_bytes:
+                    cached_issues = None # Grande demais para o cache; para de acumular
+                else:
+                    cached_issues.extend(issues)
+            yield line
+    except requests.exceptions.HTTPError as http_err:
+        error_message, details = search_error_message(http_err)
+        print(f"Erro HTTP ao paginar issues: {error_message}")
+        yield json_backend.dumps({"type": "error", "error": error_message, "details": details}) + "\n"
+        return
+    except requests.exceptions.RequestException as req_err:
+        print(f"Erro de Rede/Requisição ao paginar issues: {req_err}")
+        yield json_backend.dumps({"type": "error", "error": f"Erro de comunicação ao buscar issues: {req_err}"}) + "\n"
+        return
+    if cached_issues is not None:
+        search_cache.put(cache_entry['key'], {"total": total, "issues": cached_issues},
+                         jira_instance_url, cache_entry['scope'], cache_entry['projects'],
+                         size=cached_bytes)
+    yield json_backend.dumps({"type": "end", "count": count}) + "\n"
+
+
+def stream_cached_results(cached):
+    """Reproduz uma busca completa em cache no mesmo formato NDJSON de stream_search_results."""
+    issues = cached['issues']
+    yield json_backend.dumps({"type": "meta", "total": cached['total']}) + "\n"
+    for start in range(0, len(issues), SEARCH_PAGE_SIZE):
+        yield json_backend.dumps({"type": "issues", "issues": issues[start:start + SEARCH_PAGE_SIZE]}) + "\n"
+    yield json_backend.dumps({"type": "end", "count": len(issues)}) + "\n"
+
+
 # --- Rotas da Aplicação ---
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -99,6 +316,9 @@ def login():
         is_valid, result_or_error = verify_jira_credentials(jira_instance, email, api_token)
 
         if is_valid:
+            # Novo id de sessão a cada login (evita fixação de sessão)
+            if hasattr(session, 'regenerate'):
+                session.regenerate()
             # Armazena credenciais e URL base validada na sessão
             session['jira_instance_url'] = result_or_error # Armazena a URL base validada
             session['jira_email'] = email
@@ -121,6 +341,11 @@ def login():
 @app.route('/logout')
 def logout():
     """Limpa a sessão do usuário."""
+    if 'jira_api_token' in session:
+        jira_pool.discard(session.get('jira_instance_url'), session.get('jira_email'),
+                          session['jira_api_token'])
+        search_cache.invalidate_scope(credential_scope(
+            session.get('jira_instance_url'), session.get('jira_email'), session['jira_api_token']))
     session.pop('jira_instance_url', None)
     session.pop('jira_email', None)
     session.pop('jira_api_token', None)
@@ -146,93 +371,91 @@ def index():
 @app.route('/search_issues', methods=['POST'])
 @login_required # Protege a rota de busca
 def search_jira_issues():
-    """Recebe JQL via POST e busca issues usando a API v2 do Jira."""
+    """Recebe JQL via POST e busca issues usando a API v2 do Jira.
+
+    Por padrão retorna uma página (startAt/maxResults) com o total. Com "stream": true,
+    percorre todas as páginas e responde em NDJSON (ver stream_search_results).
+    "fields"/"expand" escolhem os campos retornados (ver field_projection.FIELD_SPECS).
+    """
 
     jira_instance_url = session['jira_instance_url']
     email = session['jira_email']
     api_token = session['jira_api_token']
 
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "O corpo JSON deve ser um objeto com o campo 'jql'."}), 400
         jql_query = data.get('jql')
+        # stream=True percorre todas as páginas e responde em NDJSON; caso contrário, uma página
+        stream = bool(data.get('stream'))
+        refresh = bool(data.get('refresh')) # Ignora o cache e busca de novo no Jira
+        try:
+            start_at = max(int_field(data, 'startAt', 0), 0)
+            max_results = min(max(int_field(data, 'maxResults', SEARCH_PAGE_SIZE), 1), SEARCH_PAGE_SIZE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         if not jql_query:
             return jsonify({"error": "Consulta JQL não fornecida."}), 400
 
-        # API v2 endpoint for search
-        search_url = f"{jira_instance_url}/rest/api/2/search"
-
-        # Parâmetros da requisição GET para a API do Jira
-        params = {
-            'jql': jql_query,
-            # Campos que queremos retornar (otimização)
-            'fields': 'key,summary,status,assignee,issuetype',
-            'maxResults': 100 # Limita o número de resultados (ajuste conforme necessário)
-            # 'startAt': 0 # Para paginação futura
-        }
-
-        headers = {"Accept": "application/json"}
-        auth = HTTPBasicAuth(email, api_token)
-
-        # Faz a requisição GET para a API do Jira
-        response = requests.get(
-            search_url,
-            headers=headers,
-            params=params, # Parâmetros vão na URL para GET
-            auth=auth,
-            timeout=30
-        )
+        # Campos que queremos retornar (otimização): só o que o frontend pediu é trafegado
+        try:
+            projection = projection_from_request(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Consulta o cache antes de ir ao Jira (chave inclui a credencial do usuário)
+        scope = credential_scope(jira_instance_url, email, api_token)
+        if stream:
+            cache_key = search_cache.make_key(scope, jira_instance_url, jql_query, mode='all', projection=projection.cache_token())
+        else:
+            cache_key = search_cache.make_key(scope, jira_instance_url, jql_query, projection=projection.cache_token(),
+                                              startAt=start_at, maxResults=max_results)
+        cached = None if refresh else search_cache.get(cache_key)
+        if cached is not None:
+            if stream:
+                return Response(stream_cached_results(cached), mimetype='application/x-ndjson')
+            return jsonify(cached), 200
+        cache_entry = {'key': cache_key, 'scope': scope, 'projects': projects_in_jql(jql_query)}
+
+        # Faz a requisição GET para a API do Jira (API v2 endpoint for search)
+        client = jira_pool.get_client(jira_instance_url, email, api_token)
+        response = client.search(jql_query, start_at=start_at, max_results=max_results,
+                                 fields=projection.jira_fields, expand=projection.jira_expand)
 
         # Verifica se o token ainda é válido (pode ter sido revogado)
         if response.status_code == 401:
-             session.clear()
-             return jsonify({"error": "Sua sessão expirou ou o API Token tornou-se inválido. Faça login novamente.", "redirect": url_for('login')}), 401
+             return expired_token_response(jira_instance_url, email, api_token)
 
         # Verifica outros erros HTTP (como 400 Bad Request para JQL inválida)
         response.raise_for_status() # Lança exceção para 4xx/5xx (exceto 401 tratado acima)
 
-        # Processa a resposta de sucesso
-        jira_response = response.json()
-        issues_raw = jira_response.get('issues', [])
+        # Processa a resposta de sucesso (decodifica direto dos bytes com o backend rápido)
+        jira_response = loads_response(response)
+
+        if stream:
+            # Demais páginas são buscadas enquanto o navegador já renderiza as primeiras
+            return Response(
+                stream_with_context(stream_search_results(
+                    client, jql_query, jira_response, projection, jira_instance_url, cache_entry)),
+                mimetype='application/x-ndjson')
 
         # Simplifica os dados antes de enviar para o frontend
-        simplified_issues = []
-        for issue in issues_raw:
-            fields = issue.get('fields', {})
-            assignee_info = fields.get('assignee')
-            status_info = fields.get('status')
-            issuetype_info = fields.get('issuetype')
-
-            simplified_issues.append({
-                'key': issue.get('key'),
-                'url': f"{jira_instance_url}/browse/{issue.get('key')}",
-                'summary': fields.get('summary'),
-                'status': status_info.get('name') if status_info else 'N/A',
-                'assignee': assignee_info.get('displayName') if assignee_info else None, # Pode ser None
-                'issuetype': issuetype_info.get('name') if issuetype_info else 'N/A'
-            })
-
-        return jsonify({"issues": simplified_issues}), 200
+        simplified_issues = projection.extract_all(jira_response.get('issues', []), jira_instance_url)
+
+        result = {
+            "issues": simplified_issues,
+            "startAt": jira_response.get('startAt', start_at),
+            "maxResults": jira_response.get('maxResults', max_results),
+            "total": jira_response.get('total', len(simplified_issues))
+        }
+        search_cache.put(cache_key, result, jira_instance_url, scope, cache_entry['projects'])
+        return jsonify(result), 200
 
     except requests.exceptions.HTTPError as http_err:
         status_code = http_err.response.status_code
-        error_message = f"Erro na busca ({status_code})"
-        details = ""
-        try:
-            # Tenta pegar a mensagem de erro específica do Jira (útil para JQL inválido)
-            error_details = http_err.response.json()
-            jira_errors = error_details.get('errorMessages', [])
-            if jira_errors:
-                 error_message += f": {', '.join(jira_errors)}"
-                 details = ', '.join(jira_errors) # Guarda detalhes para possível uso no JS
-            # Adiciona erros de campos específicos se houver (raro em busca, mas possível)
-            field_errors = error_details.get('errors', {})
-            if field_errors:
-                 error_message += f" Errors: {field_errors}"
-
-        except ValueError: # Se a resposta de erro não for JSON
-            error_message += f": {http_err.response.text[:200]}..." # Limita tamanho
-
+        error_message, details = search_error_message(http_err)
         print(f"Erro HTTP ao buscar issues: {error_message}")
         # Retorna detalhes no erro para o JS poder checar se é JQL inválido
         return jsonify({"error": error_message, "details": details}), status_code
@@ -245,6 +468,28 @@ def search_jira_issues():
         # Adiciona traceback para debug se necessário: import traceback; traceback.print_exc()
         return jsonify({"error": f"Ocorreu um erro interno no servidor: {e}"}), 500
 
+@app.route('/search_cache/stats')
+@login_required
+def search_cache_stats():
+    """Contadores do cache de busca (hits, misses, evictions...) para dimensioná-lo."""
+    return jsonify(search_cache.stats()), 200
+
+@app.route('/credential_cache/stats')
+@login_required
+def credential_cache_stats():
+    """Contadores do cache de verificação de login (hits, misses, bloqueios e hit rate)."""
+    return jsonify(credential_cache.stats()), 200
+
+# Caches entram no /metrics como gauges
+metrics.registry.register_gauges('search_cache', 'Cache de busca JQL', search_cache.stats)
+metrics.registry.register_gauges('credential_cache', 'Cache de verificação de login', credential_cache.stats)
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Métricas no formato texto do Prometheus (latências, status, bytes, chamadas ao Jira, caches)."""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
 # ... (restante do app.py, if __name__ == '__main__': etc.)
 
 @app.route('/create_issue', methods=['POST'])
@@ -267,33 +512,21 @@ def create_jira_issue():
         if not all([project_key, issue_type_id, summary]):
             return jsonify({"error": "Campos obrigatórios (Chave do Projeto, ID do Tipo, Resumo) não fornecidos."}), 400
 
-        api_url = f"{jira_instance_url}/rest/api/3/issue"
-        payload = {
-            "fields": {
-                "project": {"key": project_key.upper()},
-                "issuetype": {"id": issue_type_id},
-                "summary": summary,
-                "description": {
-                    "type": "doc", "version": 1,
-                    "content": [{"type": "paragraph", "content": [{"type": "text", "text": description_text or " "}]}]
-                }
-            }
-        }
-        headers = {"Accept": "application/json", "Content-Type": "application/json"}
-        auth = HTTPBasicAuth(email, api_token)
-
-        response = requests.post(api_url, json=payload, headers=headers, auth=auth, timeout=30)
+        payload = build_issue_payload(project_key, issue_type_id, summary, description_text)
+        client = jira_pool.get_client(jira_instance_url, email, api_token)
+        response = client.post("/rest/api/3/issue", json=payload)
 
         # Verifica se o token ainda é válido (pode ter sido revogado desde o login)
         if response.status_code == 401:
              # Limpa a sessão e pede novo login
-             session.clear()
-             return jsonify({"error": "Sua sessão expirou ou o API Token tornou-se inválido. Faça login novamente.", "redirect": url_for('login')}), 401
+             return expired_token_response(jira_instance_url, email, api_token)
 
         response.raise_for_status() # Lança exceção para outros erros (4xx, 5xx)
 
         jira_response = response.json()
         issue_key = jira_response.get('key')
+        # Buscas em cache que podem incluir este projeto ficam desatualizadas
+        search_cache.invalidate_project(jira_instance_url, project_key)
         issue_url = f"{jira_instance_url}/browse/{issue_key}"
 
         return jsonify({
@@ -304,11 +537,7 @@ def create_jira_issue():
 
     except requests.exceptions.HTTPError as http_err:
         status_code = http_err.response.status_code
-        try:
-            error_details = http_err.response.json()
-            error_message = f"Erro do Jira ({status_code}): {error_details.get('errorMessages', [])} {error_details.get('errors', {})}"
-        except ValueError:
-            error_message = f"Erro HTTP ({status_code}): {http_err.response.text}"
+        error_message = jira_error_message(http_err.response)
         print(f"Erro HTTP ao criar issue: {error_message}")
         return jsonify({"error": error_message}), status_code
     except requests.exceptions.RequestException as req_err:
@@ -319,6 +548,176 @@ def create_jira_issue():
         return jsonify({"error": f"Ocorreu um erro interno no servidor: {e}"}), 500
 
 
+def read_bulk_items():
+    """Lê os itens do lote do corpo JSON ({"issues": [...]}) ou de um CSV enviado no campo 'file'.
+
+    Colunas do CSV: projectKey, issueTypeId, summary, description.
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        text = io.TextIOWrapper(upload.stream, encoding='utf-8-sig')
+        return list(csv.DictReader(text))
+    data = request.get_json(silent=True)
+    if data is None:
+        return []
+    if not isinstance(data, dict):
+        raise ValueError("O corpo JSON deve ser um objeto com a lista 'issues'.")
+    issues = data.get('issues') or []
+    if not isinstance(issues, list):
+        raise ValueError("O campo 'issues' deve ser uma lista.")
+    for index, item in enumerate(issues):
+        if not isinstance(item, dict):
+            raise ValueError(f"O item {index} de 'issues' deve ser um objeto.")
+    return issues
+
+
+def bulk_field(item, name):
+    """Valor de um campo do item como texto: JSON pode trazer números (ex.: issueTypeId 10001)."""
+    value = item.get(name)
+    return '' if value is None else str(value).strip()
+
+
+def create_bulk_chunk(client, chunk):
+    """Envia um bloco de até BULK_CHUNK_SIZE issues. Retorna (status_code, resultados por índice)."""
+    indexes = [index for index, _ in chunk]
+    response = client.create_issues_bulk([payload for _, payload in chunk])
+    if response.status_code == 401:
+        return 401, {index: {"ok": False, "error": "O Jira recusou o API Token (401)."} for index in indexes}
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    if not isinstance(body, dict):
+        # Sem corpo JSON não há como saber quais itens foram criados
+        status_code = response.status_code if response.status_code >= 400 else 502
+        error_message = jira_error_message(response) if response.status_code >= 400 else "Resposta inválida do Jira."
+        return status_code, {index: {"ok": False, "error": error_message} for index in indexes}
+    element_errors = body.get('errors')
+    # Com erros por item o Jira responde 201 (parcial) ou 400 (todos falharam) com uma lista
+    # em 'errors'; sem essa lista, a falha é do bloco inteiro (ex.: 403, 5xx)
+    if response.status_code >= 400 and not isinstance(element_errors, list):
+        error_message = jira_error_message(response)
+        return response.status_code, {index: {"ok": False, "error": error_message} for index in indexes}
+
+    results = {}
+    # failedElementNumber é a posição do item dentro do bloco enviado
+    for error in element_errors or []:
+        position = error.get('failedElementNumber')
+        if position is None or position >= len(indexes):
+            continue
+        element_errors = error.get('elementErrors', {})
+        results[indexes[position]] = {
+            "ok": False,
+            "error": f"Erro do Jira ({error.get('status')}): {element_errors.get('errorMessages', [])} {element_errors.get('errors', {})}"
+        }
+    # As issues criadas voltam na mesma ordem dos itens que não falharam
+    succeeded = [index for index in indexes if index not in results]
+    for index, created in zip(succeeded, body.get('issues', [])):
+        results[index] = {"ok": True, "issueKey": created.get('key')}
+    for index in succeeded[len(body.get('issues', [])):]:
+        results.setdefault(index, {"ok": False, "error": "Jira não retornou resultado para este item."})
+    return response.status_code, results
+
+
+def send_bulk_chunk(client, chunk, auth_failed):
+    """create_bulk_chunk sem exceções: retorna (status_code, resultados por índice, erro de comunicação).
+
+    Depois de um 401 os blocos restantes não são enviados (o token foi recusado).
+    """
+    indexes = [index for index, _ in chunk]
+    if auth_failed.is_set():
+        return 401, {index: {"ok": False, "error": "Não enviada: o Jira recusou o API Token."} for index in indexes}, None
+    try:
+        status_code, results = create_bulk_chunk(client, chunk)
+    except requests.exceptions.RequestException as req_err:
+        # Sem resposta não há como saber se o Jira chegou a criar o bloco
+        error_message = f"Erro de comunicação com o Jira; verifique se a issue foi criada antes de reenviar: {req_err}"
+        return None, {index: {"ok": False, "error": error_message} for index in indexes}, req_err
+    if status_code == 401:
+        auth_failed.set()
+    return status_code, results, None
+
+
+@app.route('/create_issues_bulk', methods=['POST'])
+@login_required
+def create_jira_issues_bulk():
+    """Cria várias issues de uma vez (JSON ou CSV), em blocos de 50 via /rest/api/3/issue/bulk.
+
+    Os blocos são enviados com concorrência limitada (JIRA_BULK_CONCURRENCY). A resposta
+    traz um resultado por item, na ordem recebida, com issueKey ou a mensagem de erro,
+    inclusive quando um bloco falha por token recusado (401) ou erro de comunicação (500):
+    as issues já criadas continuam listadas, para o lote não ser reenviado inteiro.
+    """
+    jira_instance_url = session['jira_instance_url']
+    email = session['jira_email']
+    api_token = session['jira_api_token']
+
+    try:
+        items = read_bulk_items()
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({"error": f"Arquivo CSV inválido: {e}"}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not items:
+        return jsonify({"error": "Nenhuma issue fornecida."}), 400
+    if len(items) > BULK_MAX_ISSUES:
+        return jsonify({"error": f"Máximo de {BULK_MAX_ISSUES} issues por lote."}), 400
+
+    results = [None] * len(items)
+    payloads = []
+    projects = set()
+    for index, item in enumerate(items):
+        project_key = bulk_field(item, 'projectKey')
+        issue_type_id = bulk_field(item, 'issueTypeId')
+        summary = bulk_field(item, 'summary')
+        if not all([project_key, issue_type_id, summary]):
+            results[index] = {"ok": False, "error": "Campos obrigatórios (Chave do Projeto, ID do Tipo, Resumo) não fornecidos."}
+            continue
+        payloads.append((index, build_issue_payload(project_key, issue_type_id, summary, bulk_field(item, 'description'))))
+        projects.add(project_key.upper())
+
+    chunks = [payloads[start:start + BULK_CHUNK_SIZE] for start in range(0, len(payloads), BULK_CHUNK_SIZE)]
+    client = jira_pool.get_client(jira_instance_url, email, api_token)
+    auth_failed = threading.Event()
+    request_errors = []
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(BULK_CONCURRENCY, len(chunks)))) as executor:
+            for _, chunk_results, req_err in executor.map(
+                    lambda chunk: send_bulk_chunk(client, chunk, auth_failed), chunks):
+                if req_err is not None:
+                    request_errors.append(req_err)
+                for index, result in chunk_results.items():
+                    results[index] = result
+    finally:
+        # Mesmo com falha parcial, buscas em cache desses projetos podem estar desatualizadas
+        for project_key in projects:
+            search_cache.invalidate_project(jira_instance_url, project_key)
+
+    for index, result in enumerate(results):
+        result["index"] = index
+        if result.get("ok"):
+            result["issueUrl"] = f"{jira_instance_url}/browse/{result['issueKey']}"
+
+    created = sum(1 for result in results if result["ok"])
+    body = {
+        "message": f"{created} de {len(results)} issues criadas.",
+        "created": created,
+        "failed": len(results) - created,
+        "results": results
+    }
+    if auth_failed.is_set():
+        forget_credentials(jira_instance_url, email, api_token)
+        body.update(error=EXPIRED_TOKEN_ERROR, redirect=url_for('login'))
+        return jsonify(body), 401
+    if request_errors:
+        print(f"Erro na Requisição ao criar issues em lote: {request_errors[0]}")
+        body["error"] = f"Ocorreu um erro de comunicação ao tentar criar parte das issues: {request_errors[0]}"
+        return jsonify(body), 500
+    return jsonify(body), 200
+
+
 if __name__ == '__main__':
     # Use uma porta diferente se necessário
     # debug=True é ótimo para desenvolvimento, mas NUNCA use em produção com esta chave secreta hardcoded!
@@ -0,0 +1,100 @@
+# credential_cache.py
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class CredentialCache:
+    """Cache de verificações de credenciais do Jira (/myself).
+
+    - Positivo: (instância, email, token) verificados recentemente pulam a chamada ao Jira.
+    - Negativo: falhas de autenticação seguidas por (instância, email) bloqueiam novas
+      tentativas não verificadas desse email, com backoff exponencial, para que um
+      ataque de força bruta (um token novo a cada tentativa) não chegue ao Jira.
+      Um token já no cache positivo continua passando durante o bloqueio, então quem
+      só conhece o email atrasa no máximo negative_max segundos um login novo do dono.
+
+    As chaves são HMAC-SHA256 com um sal aleatório do processo; nem o token nem um
+    hash reutilizável dele ficam em memória.
+    """
+
+    def __init__(self, ttl=300, max_entries=1024, negative_base=1, negative_max=60):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.negative_base = negative_base
+        self.negative_max = negative_max
+        self._salt = os.urandom(16)
+        self._verified = OrderedDict()  # chave -> (base_url, expira_em)
+        self._failures = OrderedDict()  # chave de (instância, email) -> (falhas, bloqueado_até, mensagem)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+
+    def _key(self, *parts):
+        raw = "\0".join(parts).encode('utf-8')
+        return hmac.new(self._salt, raw, hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def _bound(entries, max_entries):
+        while len(entries) > max_entries:
+            entries.popitem(last=False)
+
+    def lookup(self, base_url, email, api_token):
+        """Retorna (True, base_url) ou (False, mensagem) se houver resultado em cache; senão None."""
+        now = time.time()
+        with self._lock:
+            key = self._key(base_url, email, api_token)
+            verified = self._verified.get(key)
+            if verified is not None:
+                if verified[1] > now:
+                    self._verified.move_to_end(key)
+                    self.hits += 1
+                    return True, verified[0]
+                del self._verified[key]
+
+            failure = self._failures.get(self._key(base_url, email))
+            if failure is not None and failure[1] > now:
+                self.negative_hits += 1
+                wait = int(failure[1] - now) + 1
+                return False, f"{failure[2]} Aguarde {wait}s antes de tentar novamente."
+            self.misses += 1
+            return None
+
+    def record_success(self, base_url, email, api_token):
+        with self._lock:
+            key = self._key(base_url, email, api_token)
+            self._failures.pop(self._key(base_url, email), None)
+            self._verified[key] = (base_url, time.time() + self.ttl)
+            self._verified.move_to_end(key)
+            self._bound(self._verified, self.max_entries)
+
+    def record_failure(self, base_url, email, message):
+        """Registra uma falha de autenticação (401/403) do email; o bloqueio dobra a cada falha seguida."""
+        with self._lock:
+            key = self._key(base_url, email)
+            failures = self._failures.get(key, (0, 0, ''))[0] + 1
+            delay = min(self.negative_base * (2 ** (failures - 1)), self.negative_max)
+            self._failures[key] = (failures, time.time() + delay, message)
+            self._failures.move_to_end(key)
+            self._bound(self._failures, self.max_entries)
+
+    def forget(self, base_url, email, api_token):
+        """Remove a verificação positiva (ex.: o Jira passou a recusar o token)."""
+        with self._lock:
+            self._verified.pop(self._key(base_url, email, api_token), None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.negative_hits
+            return {
+                'verified_entries': len(self._verified),
+                'blocked_entries': len(self._failures),
+                'hits': self.hits,
+                'misses': self.misses,
+                'negative_hits': self.negative_hits,
+                'hit_rate': (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            }
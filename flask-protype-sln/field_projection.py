@@ -0,0 +1,135 @@
+# field_projection.py
+from functools import lru_cache
+
+
+class FieldSpec:
+    """Campo exposto ao frontend: de qual campo do Jira vem e como extrair o valor."""
+    __slots__ = ('jira_field', 'path', 'default', 'many', 'rendered')
+
+    def __init__(self, jira_field, path=(), default=None, many=False, rendered=False):
+        self.jira_field = jira_field  # Nome do campo pedido ao Jira em `fields`
+        self.path = path              # Caminho dentro do valor do campo (ex.: ('name',))
+        self.default = default        # Valor quando o campo vem vazio
+        self.many = many              # O campo é uma lista; aplica `path` a cada item
+        self.rendered = rendered      # Usa renderedFields (HTML) se 'renderedFields' for expandido
+
+
+# Campos selecionáveis pelo cliente (nome de saída -> especificação)
+FIELD_SPECS = {
+    'summary': FieldSpec('summary'),
+    'status': FieldSpec('status', ('name',), 'N/A'),
+    'assignee': FieldSpec('assignee', ('displayName',)),
+    'reporter': FieldSpec('reporter', ('displayName',)),
+    'issuetype': FieldSpec('issuetype', ('name',), 'N/A'),
+    'priority': FieldSpec('priority', ('name',)),
+    'resolution': FieldSpec('resolution', ('name',)),
+    'project': FieldSpec('project', ('key',)),
+    'created': FieldSpec('created'),
+    'updated': FieldSpec('updated'),
+    'duedate': FieldSpec('duedate'),
+    'labels': FieldSpec('labels', many=True, default=[]),
+    'components': FieldSpec('components', ('name',), many=True, default=[]),
+    'fixVersions': FieldSpec('fixVersions', ('name',), many=True, default=[]),
+    'description': FieldSpec('description', rendered=True),
+}
+
+# Colunas da tabela de resultados em index.html
+DEFAULT_FIELDS = ('summary', 'status', 'assignee', 'issuetype')
+
+# Valores de `expand` repassados ao Jira: só os que a extração usa (renderedFields em `rendered`)
+ALLOWED_EXPAND = frozenset({'renderedFields'})
+
+
+def _compile_getter(spec, use_rendered):
+    """Gera uma função (fields, rendered) -> valor para a especificação, sem interpretar o spec por issue."""
+    jira_field, path, default = spec.jira_field, spec.path, spec.default
+
+    def walk(value):
+        for step in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(step)
+        return value
+
+    if use_rendered and spec.rendered:
+        def get(fields, rendered):
+            value = rendered.get(jira_field)
+            return default if value is None else value
+    elif spec.many:
+        def get(fields, rendered):
+            items = fields.get(jira_field)
+            if not items:
+                return default
+            return [walk(item) for item in items] if path else items
+    elif path:
+        def get(fields, rendered):
+            value = walk(fields.get(jira_field))
+            return default if value is None else value
+    else:
+        def get(fields, rendered):
+            value = fields.get(jira_field)
+            return default if value is None else value
+    return get
+
+
+class Projection:
+    """Projeção compilada: define `fields`/`expand` enviados ao Jira e extrai cada issue numa passada."""
+
+    def __init__(self, fields=DEFAULT_FIELDS, expand=()):
+        unknown = [name for name in fields if name not in FIELD_SPECS]
+        if unknown:
+            raise ValueError(f"Campos desconhecidos: {', '.join(unknown)}")
+        unknown = [name for name in expand if name not in ALLOWED_EXPAND]
+        if unknown:
+            raise ValueError(f"Valores de expand não suportados: {', '.join(unknown)}")
+
+        self.fields = tuple(dict.fromkeys(fields))
+        self.expand = tuple(sorted(set(expand)))
+        use_rendered = 'renderedFields' in self.expand
+        # `key` sempre vem na raiz da issue; não precisa ser pedido em `fields`
+        self.jira_fields = ','.join(dict.fromkeys(FIELD_SPECS[name].jira_field for name in self.fields))
+        self.jira_expand = ','.join(self.expand) or None
+        self._getters = tuple((name, _compile_getter(FIELD_SPECS[name], use_rendered))
+                              for name in self.fields)
+
+    def cache_token(self):
+        """Representação estável da projeção para compor chaves de cache."""
+        return [list(self.fields), list(self.expand)]
+
+    def extract(self, issue, jira_instance_url):
+        fields = issue.get('fields') or {}
+        rendered = issue.get('renderedFields') or {}
+        key = issue.get('key')
+        result = {'key': key, 'url': f"{jira_instance_url}/browse/{key}"}
+        for name, get in self._getters:
+            result[name] = get(fields, rendered)
+        return result
+
+    def extract_all(self, issues, jira_instance_url):
+        extract = self.extract
+        return [extract(issue, jira_instance_url) for issue in issues]
+
+
+@lru_cache(maxsize=128)
+def get_projection(fields=DEFAULT_FIELDS, expand=()):
+    """Projeções são imutáveis; reaproveita a compilada para a mesma combinação de campos."""
+    return Projection(fields, expand)
+
+
+def projection_from_request(data):
+    """Lê 'fields' e 'expand' (listas ou strings separadas por vírgula) do corpo da requisição.
+
+    Lança ValueError para valores que não sejam texto ou lista de textos.
+    """
+    def as_tuple(name):
+        value = data.get(name)
+        if not value:
+            return ()
+        if isinstance(value, str):
+            value = value.split(',')
+        elif not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            raise ValueError(f"O campo '{name}' deve ser uma lista de textos ou um texto separado por vírgulas.")
+        return tuple(item.strip() for item in value if item.strip())
+
+    fields = as_tuple('fields') or DEFAULT_FIELDS
+    return get_projection(fields, as_tuple('expand'))
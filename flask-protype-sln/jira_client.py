@@ -0,0 +1,300 @@
+# jira_client.py
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+
+from json_backend import iter_items, loads_response
+
+# Status HTTP que indicam falha transitória do Jira (rate limit / indisponibilidade)
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# Métodos que podem ser repetidos com segurança em caso de erro 5xx ou de conexão
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+
+def normalize_base_url(jira_instance):
+    """Garante que a URL base da instância esteja no formato https://host sem barra final."""
+    base_url = (jira_instance or '').strip()
+    if not base_url.startswith(('http://', 'https://')):
+        base_url = f"https://{base_url}"
+    return base_url.rstrip('/')
+
+
+def _parse_retry_after(value):
+    """Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos de espera."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class JiraClient:
+    """Cliente da API do Jira ligado a uma instância e credencial, sobre uma Session keep-alive."""
+
+    def __init__(self, base_url, session, timeout=30, max_retries=3,
+                 backoff_factor=0.5, max_backoff=30, observer=None):
+        self.base_url = base_url
+        self.session = session
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        # observer(method, endpoint, status, segundos, content_length) é chamado a cada tentativa
+        self.observer = observer
+
+    def _backoff(self, attempt, response=None):
+        """Tempo de espera antes da próxima tentativa; respeita Retry-After quando presente."""
+        if response is not None:
+            retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return min(retry_after, self.max_backoff)
+        delay = self.backoff_factor * (2 ** attempt)
+        # Jitter para evitar que vários workers repitam ao mesmo tempo
+        return min(delay + random.uniform(0, self.backoff_factor), self.max_backoff)
+
+    def request(self, method, path, **kwargs):
+        """Executa a requisição com retry/backoff em 429 e 5xx. Retorna a última resposta obtida."""
+        method = method.upper()
+        absolute = path.startswith(('http://', 'https://'))
+        url = path if absolute else f"{self.base_url}{path}"
+        endpoint = urlparse(path).path if absolute else path
+        kwargs.setdefault('timeout', self.timeout)
+        idempotent = method in IDEMPOTENT_METHODS
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if self.observer is not None:
+                    self.observer(method, endpoint, 'error', time.perf_counter() - started, 0)
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            if self.observer is not None:
+                content_length = response.headers.get('Content-Length')
+                self.observer(method, endpoint, str(response.status_code), time.perf_counter() - started,
+                              int(content_length) if content_length and content_length.isdigit() else 0)
+
+            # 429 nunca foi processado pelo Jira, então é seguro repetir qualquer método.
+            # 5xx só é repetido para métodos idempotentes (evita criar issues duplicadas).
+            retryable = response.status_code == 429 or (
+                idempotent and response.status_code in RETRY_STATUS_CODES)
+            if not retryable or attempt >= self.max_retries:
+                return response
+
+            delay = self._backoff(attempt, response)
+            response.close()  # Devolve a conexão ao pool antes de dormir
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def search(self, jql, start_at=0, max_results=100, fields=None, expand=None):
+        """Busca uma página de issues (API v2). Retorna a resposta crua para o chamador tratar 401."""
+        params = {'jql': jql, 'startAt': start_at, 'maxResults': max_results}
+        if fields:
+            params['fields'] = fields
+        if expand:
+            params['expand'] = expand
+        return self.get("/rest/api/2/search", params=params)
+
+    def create_issues_bulk(self, issue_payloads):
+        """Cria várias issues numa única chamada (/rest/api/3/issue/bulk, máx. 50 por chamada)."""
+        return self.post("/rest/api/3/issue/bulk", json={"issueUpdates": issue_payloads})
+
+    def _search_page(self, jql, start_at, max_results, fields, expand, extract=None):
+        if extract is not None:
+            # Cada issue é extraída assim que é lida; o corpo cru da página nunca fica inteiro em memória
+            return {'issues': [extract(issue) for issue in
+                               self.iter_search_issues(jql, start_at, max_results, fields, expand)]}
+        response = self.search(jql, start_at, max_results, fields, expand)
+        response.raise_for_status()
+        return loads_response(response)
+
+    def iter_search_issues(self, jql, start_at=0, max_results=100, fields=None, expand=None):
+        """Gera as issues de uma página à medida que o corpo chega, sem montar o dict da resposta.
+
+        Útil para páginas muito grandes (muitos campos/expand); requer ijson para ser incremental.
+        """
+        params = {'jql': jql, 'startAt': start_at, 'maxResults': max_results}
+        if fields:
+            params['fields'] = fields
+        if expand:
+            params['expand'] = expand
+        response = self.get("/rest/api/2/search", params=params, stream=True)
+        with response:
+            response.raise_for_status()
+            response.raw.decode_content = True # Descomprime gzip ao ler o stream cru
+            yield from iter_items(response.raw, 'issues.item')
+
+    def iter_search_pages(self, jql, first_page, fields=None, expand=None, concurrency=1, extract=None):
+        """Gera as páginas seguintes a `first_page` até cobrir o `total` informado pelo Jira.
+
+        Com concurrency > 1 as páginas são buscadas em paralelo numa janela deslizante,
+        mas entregues em ordem; no máximo `concurrency` páginas ficam em memória.
+        Com `extract` (issue -> valor) as páginas são lidas por iter_search_issues e
+        trazem só {'issues': [extract(issue), ...]}.
+        Erros HTTP são propagados como requests.exceptions.HTTPError.
+        """
+        issues = first_page.get('issues', [])
+        total = first_page.get('total', len(issues))
+        # O Jira pode reduzir o maxResults pedido; usa o valor efetivamente aplicado
+        page_size = first_page.get('maxResults') or len(issues)
+        if not issues or not page_size:
+            return
+        start = first_page.get('startAt', 0) + page_size
+
+        if concurrency <= 1:
+            while start < total:
+                page = self._search_page(jql, start, page_size, fields, expand, extract)
+                if not page.get('issues'):
+                    return
+                yield page
+                start += page_size
+            return
+
+        starts = iter(range(start, total, page_size))
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            window = deque()
+            for page_start in starts:
+                window.append(executor.submit(self._search_page, jql, page_start, page_size, fields, expand, extract))
+                if len(window) >= concurrency:
+                    break
+            try:
+                while window:
+                    page = window.popleft().result()
+                    next_start = next(starts, None)
+                    if next_start is not None:
+                        window.append(executor.submit(self._search_page, jql, next_start, page_size, fields, expand, extract))
+                    yield page
+            finally:
+                for future in window:
+                    future.cancel()
+
+
+class JiraClientPool:
+    """Mantém uma requests.Session por (instância, credencial), reutilizada entre as rotas.
+
+    Cada Session possui seu próprio pool de conexões HTTP keep-alive, evitando um novo
+    handshake TCP+TLS a cada chamada ao Jira. O número de Sessions é limitado (LRU).
+    """
+
+    def __init__(self, pool_connections=4, pool_maxsize=10, max_clients=128,
+                 timeout=30, max_retries=3, backoff_factor=0.5, max_backoff=30, observer=None):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_clients = max_clients
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.observer = observer
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(base_url, email, api_token):
+        # O token não é usado em claro como chave do dicionário
+        token_digest = hashlib.sha256(api_token.encode('utf-8')).hexdigest()
+        return (base_url, email, token_digest)
+
+    def _new_session(self, email, api_token):
+        session = requests.Session()
+        # pool_block=True limita de fato o número de conexões simultâneas por host
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize, pool_block=True)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.auth = HTTPBasicAuth(email, api_token)
+        session.headers.update({"Accept": "application/json"})
+        return session
+
+    def _client(self, base_url, session):
+        return JiraClient(base_url, session, timeout=self.timeout,
+                          max_retries=self.max_retries,
+                          backoff_factor=self.backoff_factor,
+                          max_backoff=self.max_backoff,
+                          observer=self.observer)
+
+    def _store(self, key, session):
+        """Guarda a Session no pool (LRU); chamar com o lock. Retorna a Session excedente a fechar."""
+        self._sessions[key] = session
+        if len(self._sessions) > self.max_clients:
+            _, evicted = self._sessions.popitem(last=False)
+            return evicted
+        return None
+
+    def get_client(self, jira_instance, email, api_token):
+        """Retorna um JiraClient que reutiliza a Session da credencial informada."""
+        base_url = normalize_base_url(jira_instance)
+        key = self._key(base_url, email, api_token)
+        evicted = None
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._new_session(email, api_token)
+                evicted = self._store(key, session)
+            else:
+                self._sessions.move_to_end(key)
+        if evicted is not None:
+            evicted.close()
+        return self._client(base_url, session)
+
+    def new_client(self, jira_instance, email, api_token):
+        """JiraClient com uma Session própria, fora do pool (ex.: verificar uma credencial nova).
+
+        Assim tentativas de login inválidas não despejam as Sessions de quem já está logado.
+        O chamador fecha client.session ou a entrega ao pool com adopt().
+        """
+        return self._client(normalize_base_url(jira_instance), self._new_session(email, api_token))
+
+    def adopt(self, client, email, api_token):
+        """Passa ao pool a Session de um client de new_client (credencial já verificada)."""
+        key = self._key(client.base_url, email, api_token)
+        with self._lock:
+            if key in self._sessions:
+                # Outro login com a mesma credencial chegou antes: mantém a Session já no pool
+                self._sessions.move_to_end(key)
+                surplus = client.session
+            else:
+                surplus = self._store(key, client.session)
+        if surplus is not None:
+            surplus.close()
+
+    def discard(self, jira_instance, email, api_token):
+        """Fecha e remove a Session de uma credencial (ex.: logout ou token revogado)."""
+        key = self._key(normalize_base_url(jira_instance), email, api_token)
+        with self._lock:
+            session = self._sessions.pop(key, None)
+        if session is not None:
+            session.close()
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
@@ -0,0 +1,87 @@
+# json_backend.py
+import json
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+# Backend escolhido na importação: orjson > ujson > json (stdlib).
+# JSON_BACKEND=json|ujson|orjson força um backend específico.
+_preferred = os.getenv('JSON_BACKEND', '').lower()
+_candidates = [_preferred] if _preferred else ['orjson', 'ujson', 'json']
+
+BACKEND = 'json'
+for _name in _candidates:
+    try:
+        if _name == 'orjson':
+            import orjson
+        elif _name == 'ujson':
+            import ujson
+        elif _name != 'json':
+            continue
+    except ImportError:
+        continue
+    BACKEND = _name
+    break
+
+try:
+    import ijson  # Opcional: parsing incremental de respostas grandes
+except ImportError:
+    ijson = None
+
+
+if BACKEND == 'orjson':
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj, default=None, sort_keys=False):
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, default=default, option=option).decode('utf-8')
+
+elif BACKEND == 'ujson':
+    def loads(data):
+        return ujson.loads(data)
+
+    def dumps(obj, default=None, sort_keys=False):
+        # ujson não aceita `default`; recorre ao stdlib quando houver tipos não nativos
+        try:
+            return ujson.dumps(obj, ensure_ascii=False, sort_keys=sort_keys)
+        except TypeError:
+            return json.dumps(obj, default=default, ensure_ascii=False, sort_keys=sort_keys)
+
+else:
+    def loads(data):
+        return json.loads(data)
+
+    def dumps(obj, default=None, sort_keys=False):
+        return json.dumps(obj, default=default, ensure_ascii=False, sort_keys=sort_keys,
+                          separators=(',', ':'))
+
+
+def loads_response(response):
+    """Decodifica o corpo de uma resposta requests direto dos bytes (sem passar por response.text)."""
+    return loads(response.content)
+
+
+def iter_items(fileobj, prefix):
+    """Gera os itens do array em `prefix` (ex.: 'issues.item') sem materializar o documento inteiro.
+
+    Usa ijson quando instalado; sem ele, decodifica tudo e percorre o array.
+    """
+    if ijson is not None:
+        # use_float evita Decimal nos números, mantendo o mesmo tipo dos demais backends
+        yield from ijson.items(fileobj, prefix, use_float=True)
+        return
+    document = loads(fileobj.read())
+    for key in prefix.split('.')[:-1]:
+        document = document.get(key, []) if isinstance(document, dict) else []
+    yield from document
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSONProvider do Flask que serializa/decodifica com o backend mais rápido disponível."""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, default=self.default, sort_keys=kwargs.get('sort_keys', self.sort_keys))
+
+    def loads(self, s, **kwargs):
+        return loads(s)
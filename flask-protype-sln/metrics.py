@@ -0,0 +1,217 @@
+# metrics.py
+import bisect
+import threading
+import time
+
+from flask import g, has_request_context, request
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        labels = tuple(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [contagem por bucket..., soma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        labels = tuple(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1  # O último "bucket" é +Inf
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(state)) for labels, state in self._values.items())
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {state[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {state[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Coleção de métricas renderizada no formato texto do Prometheus."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_gauges(self, prefix, documentation, stats_fn):
+        """Expõe como gauges os valores numéricos de um dict de estatísticas (ex.: cache.stats())."""
+        self._collectors.append((prefix, documentation, stats_fn))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, documentation, stats_fn in self._collectors:
+            for key, value in sorted(stats_fn().items()):
+                if isinstance(value, (int, float)):
+                    name = f"{prefix}_{key}"
+                    lines.append(f"# HELP {name} {documentation}: {key}")
+                    lines.append(f"# TYPE {name} gauge")
+                    lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    'http_request_duration_seconds', 'Latência total da requisição', ('route', 'method'))
+request_local_duration = registry.histogram(
+    'http_request_local_duration_seconds', 'Latência da requisição sem o tempo gasto no Jira', ('route', 'method'))
+requests_total = registry.counter(
+    'http_requests_total', 'Requisições por status', ('route', 'method', 'status'))
+request_bytes = registry.counter(
+    'http_request_bytes_total', 'Bytes recebidos no corpo das requisições', ('route',))
+response_bytes = registry.counter(
+    'http_response_bytes_total', 'Bytes enviados no corpo das respostas', ('route',))
+
+upstream_duration = registry.histogram(
+    'jira_upstream_duration_seconds', 'Latência de cada chamada ao Jira', ('endpoint', 'method'))
+upstream_requests = registry.counter(
+    'jira_upstream_requests_total', 'Chamadas ao Jira por status', ('endpoint', 'method', 'status'))
+upstream_bytes = registry.counter(
+    'jira_upstream_response_bytes_total', 'Bytes recebidos do Jira (Content-Length)', ('endpoint',))
+
+
+def observe_upstream(method, endpoint, status, seconds, content_length):
+    """Callback do JiraClientPool: registra cada chamada ao Jira e soma o tempo à requisição atual.
+
+    Chamadas feitas em threads de executor (páginas paralelas, lotes) não têm contexto de
+    requisição e entram só nas métricas de upstream.
+    """
+    upstream_duration.observe(seconds, (endpoint, method))
+    upstream_requests.inc((endpoint, method, status))
+    if content_length:
+        upstream_bytes.inc((endpoint,), content_length)
+    if has_request_context() and 'upstream_seconds' in g:
+        g.upstream_seconds += seconds
+
+
+def _observe(route, method, status, elapsed, upstream_seconds, bytes_in, bytes_out):
+    request_duration.observe(elapsed, (route, method))
+    request_local_duration.observe(max(0.0, elapsed - upstream_seconds), (route, method))
+    requests_total.inc((route, method, str(status)))
+    if bytes_in:
+        request_bytes.inc((route,), bytes_in)
+    if bytes_out:
+        response_bytes.inc((route,), bytes_out)
+
+
+def _counting(iterable, body):
+    """Repassa o corpo de uma resposta em stream somando os bytes enviados em body['bytes']."""
+    try:
+        for chunk in iterable:
+            body['bytes'] += len(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            yield chunk
+    except Exception:
+        body['failed'] = True
+        raise
+    finally:
+        close = getattr(iterable, 'close', None)
+        if close is not None:
+            close()
+
+
+def init_app(app):
+    """Instala os hooks de medição por rota no app Flask."""
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+        g.upstream_seconds = 0.0
+
+    @app.after_request
+    def _record(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        g.metrics_recorded = True
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        method = request.method
+        bytes_in = request.content_length or 0
+        state = g._get_current_object()
+        # Em stream (ex.: NDJSON de /search_issues) não há Content-Length: conta o que é enviado
+        body = {'bytes': 0, 'failed': False}
+        if response.is_streamed:
+            response.response = _counting(response.response, body)
+
+        # Respostas em stream só terminam quando o corpo é consumido: mede no fechamento
+        def _on_close():
+            # Um stream interrompido por exceção chegou truncado ao cliente: conta como 500
+            status = 500 if body['failed'] else response.status_code
+            bytes_out = body['bytes'] if response.is_streamed else response.content_length
+            _observe(route, method, status, time.perf_counter() - started,
+                     state.upstream_seconds, bytes_in, bytes_out)
+
+        response.call_on_close(_on_close)
+        return response
+
+    @app.teardown_request
+    def _record_unhandled(exc):
+        # after_request não roda quando a exceção se propaga sem virar resposta
+        # (PROPAGATE_EXCEPTIONS, modo debug): registra a requisição como 500
+        started = g.get('request_started')
+        if exc is None or started is None or g.get('metrics_recorded'):
+            return
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        _observe(route, request.method, 500, time.perf_counter() - started,
+                 g.get('upstream_seconds', 0.0), request.content_length or 0, 0)
@@ -0,0 +1,256 @@
+# search_cache.py
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# project = ABC | project in (ABC, "DEF") | project = 'ABC'
+_PROJECT_CLAUSE = re.compile(
+    r"""\bproject\s*(?P<op>=|!=|\bnot\s+in\b|\bin\b)\s*(?P<value>\([^)]*\)|"[^"]*"|'[^']*'|[^\s)]+)""",
+    re.IGNORECASE)
+_OR_OPERATOR = re.compile(r"\bor\b", re.IGNORECASE)
+
+
+def projects_in_jql(jql):
+    """Retorna o conjunto de chaves de projeto às quais a JQL se restringe, ou None se não for possível saber.
+
+    None significa "pode tocar qualquer projeto" (sem cláusula project, OR, negação...).
+    """
+    if _OR_OPERATOR.search(jql):
+        return None
+    projects = None
+    for match in _PROJECT_CLAUSE.finditer(jql):
+        op = match.group('op').lower()
+        if op not in ('=', 'in'):
+            return None
+        value = match.group('value').strip('()')
+        keys = {part.strip().strip('"\'').upper() for part in value.split(',') if part.strip()}
+        # Várias cláusulas project unidas por AND: vale a interseção
+        projects = keys if projects is None else projects & keys
+    return projects
+
+
+def credential_scope(jira_instance_url, email, api_token):
+    """Identificador opaco da credencial; entradas de usuários diferentes nunca se misturam."""
+    raw = f"{jira_instance_url}\0{email}\0{api_token}".encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
+
+class RedisBackend:
+    """Backend compartilhado opcional (requer o pacote redis). Qualquer objeto com get/set/delete serve."""
+
+    def __init__(self, url, prefix='jira-search:'):
+        import redis  # Dependência opcional, só necessária se este backend for usado
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self._redis.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self._redis.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self._redis.delete(self.prefix + key)
+
+
+class DictBackend:
+    """Substituto local do backend compartilhado (testes/desenvolvimento)."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'expires_at', 'stored_at', 'checked_at', 'instance', 'scope', 'projects')
+
+    def __init__(self, value, size, expires_at, stored_at, instance, scope, projects):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.stored_at = stored_at
+        self.checked_at = time.time()  # Última conferência das marcas de invalidação compartilhadas
+        self.instance = instance
+        self.scope = scope
+        self.projects = projects
+
+
+class SearchCache:
+    """Cache LRU com TTL para resultados de busca JQL, limitado em entradas e em bytes.
+
+    As chaves incluem o escopo da credencial (ver credential_scope). Um backend
+    compartilhado opcional funciona como segundo nível; invalidações são registradas
+    nele como marcas de tempo por (instância, projeto), para valer entre processos.
+    Um acerto local confere essas marcas no máximo a cada `recheck_interval` segundos,
+    então uma invalidação feita em outro processo vale aqui em até esse intervalo.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024, ttl=60,
+                 max_entry_bytes=None, backend=None, recheck_interval=1.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 8
+        self.backend = backend
+        self.recheck_interval = recheck_interval
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(scope, jira_instance_url, jql, **params):
+        raw = json.dumps([scope, jira_instance_url, jql, params], sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        return entry
+
+    def _invalidated_since(self, instance, projects, stored_at):
+        if self.backend is None:
+            return False
+        # Entradas sem projeto conhecido são afetadas por qualquer invalidação da instância
+        names = ['*'] if projects is None else sorted(projects)
+        for name in names:
+            marker = self.backend.get(f"invalidated:{instance}:{name}")
+            if marker is not None and marker >= stored_at:
+                return True
+        return False
+
+    def get(self, key):
+        """Retorna o valor em cache ou None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is not None and (self.backend is None
+                                      or now - entry.checked_at < self.recheck_interval):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+
+        if entry is not None:
+            # Outro processo pode ter invalidado o projeto: confere as marcas fora do lock
+            invalidated = self._invalidated_since(entry.instance, entry.projects, entry.stored_at)
+            with self._lock:
+                current = self._entries.get(key) is entry
+                if not invalidated:
+                    entry.checked_at = now
+                    if current:
+                        self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value
+                if current:
+                    self._remove(key)
+                    self.invalidations += 1
+
+        if self.backend is not None:
+            shared = self.backend.get(f"entry:{key}")
+            if shared is not None:
+                projects = set(shared['projects']) if shared['projects'] is not None else None
+                if not self._invalidated_since(shared['instance'], projects, shared['stored_at']):
+                    with self._lock:
+                        self.hits += 1
+                    self._store(key, shared['value'], shared['size'], shared['instance'],
+                                shared['scope'], projects, shared['stored_at'], publish=False)
+                    return shared['value']
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value, instance, scope, projects, size=None):
+        """Armazena `value`; `projects` é o resultado de projects_in_jql para a consulta."""
+        if size is None:
+            size = len(json.dumps(value))
+        if size > self.max_entry_bytes:
+            return False
+        self._store(key, value, size, instance, scope, projects, time.time(), publish=True)
+        return True
+
+    def _store(self, key, value, size, instance, scope, projects, stored_at, publish):
+        entry = _Entry(value, size, stored_at + self.ttl, stored_at, instance, scope, projects)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        if publish and self.backend is not None:
+            self.backend.set(f"entry:{key}", {
+                'value': value, 'size': size, 'stored_at': stored_at, 'instance': instance,
+                'scope': scope, 'projects': sorted(projects) if projects is not None else None,
+            }, self.ttl)
+
+    def invalidate_project(self, instance, project_key):
+        """Descarta buscas (de todos os usuários da instância) que podem incluir o projeto."""
+        project_key = project_key.upper()
+        with self._lock:
+            stale = [key for key, entry in self._entries.items()
+                     if entry.instance == instance
+                     and (entry.projects is None or project_key in entry.projects)]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+        if self.backend is not None:
+            now = time.time()
+            self.backend.set(f"invalidated:{instance}:{project_key}", now, self.ttl)
+            self.backend.set(f"invalidated:{instance}:*", now, self.ttl)
+        return len(stale)
+
+    def invalidate_scope(self, scope):
+        """Descarta as entradas de uma credencial (ex.: logout)."""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.scope == scope]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
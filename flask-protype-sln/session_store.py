@@ -0,0 +1,229 @@
+# session_store.py
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+import json_backend
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Sessão cujo conteúdo fica no servidor; o cookie carrega apenas o id opaco."""
+
+    def __init__(self, initial=None, sid=None, new=False, expires_at=0):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at  # Validade registrada no backend
+        self.modified = False
+        self.previous_sid = None
+
+    def regenerate(self):
+        """Troca o id da sessão (chamar no login, contra fixação de sessão)."""
+        if self.previous_sid is None and not self.new:
+            self.previous_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.modified = True
+
+
+class MemorySessionBackend:
+    """Sessões em memória do processo, com expiração e limite de entradas (LRU).
+
+    Sessões anônimas (só um flash, por exemplo) ficam num LRU próprio e menor: uma
+    enxurrada de requisições sem login descarta apenas outras sessões anônimas, nunca
+    as de usuários logados.
+    """
+
+    def __init__(self, max_entries=10000, max_anonymous=1000):
+        self.max_entries = max_entries
+        self.max_anonymous = max_anonymous
+        self._data = OrderedDict()
+        self._anonymous = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load_from(entries, sid):
+        item = entries.get(sid)
+        if item is None:
+            return None
+        data, expires_at = item
+        if expires_at <= time.time():
+            del entries[sid]
+            return None
+        entries.move_to_end(sid)
+        return dict(data), expires_at
+
+    def load(self, sid):
+        with self._lock:
+            return self._load_from(self._data, sid) or self._load_from(self._anonymous, sid)
+
+    def save(self, sid, data, expires_at, anonymous=False):
+        with self._lock:
+            entries, other = (self._anonymous, self._data) if anonymous else (self._data, self._anonymous)
+            limit = self.max_anonymous if anonymous else self.max_entries
+            other.pop(sid, None)
+            entries[sid] = (dict(data), expires_at)
+            entries.move_to_end(sid)
+            while len(entries) > limit:
+                entries.popitem(last=False)
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+            self._anonymous.pop(sid, None)
+
+
+class SQLiteSessionBackend:
+    """Sessões num arquivo SQLite, compartilhadas entre processos/workers da mesma máquina.
+
+    Mantém um cache local das sessões decodificadas por `cache_ttl` segundos, para não
+    consultar o banco a cada requisição; alterações feitas em outro worker são vistas
+    após esse intervalo.
+    """
+
+    def __init__(self, path='sessions.db', cache_ttl=5, cache_entries=1000):
+        self.path = path
+        self.cache_ttl = cache_ttl
+        self.cache_entries = cache_entries
+        self._local = threading.local()
+        self._cache = OrderedDict()  # sid -> (dados, expira_em, válido_até)
+        self._lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    sid TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _cache_put(self, sid, data, expires_at):
+        with self._lock:
+            self._cache[sid] = (data, expires_at, time.time() + self.cache_ttl)
+            self._cache.move_to_end(sid)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def load(self, sid):
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(sid)
+            if cached is not None and cached[1] > now and cached[2] > now:
+                self._cache.move_to_end(sid)
+                return dict(cached[0]), cached[1]
+        row = self._connection().execute(
+            "SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at > ?", (sid, now)
+        ).fetchone()
+        if row is None:
+            with self._lock:
+                self._cache.pop(sid, None)
+            return None
+        data = json_backend.loads(row[0])
+        self._cache_put(sid, data, row[1])
+        return dict(data), row[1]
+
+    def save(self, sid, data, expires_at, anonymous=False):
+        # Não há despejo por LRU aqui; sessões anônimas só recebem uma validade curta
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)",
+                (sid, json_backend.dumps(dict(data)), expires_at))
+            # Limpeza oportunista das sessões vencidas (usa o índice de expires_at)
+            if secrets.randbelow(100) == 0:
+                conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+        self._cache_put(sid, dict(data), expires_at)
+
+    def delete(self, sid):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+        with self._lock:
+            self._cache.pop(sid, None)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """SessionInterface do Flask que guarda os dados num backend (memória ou SQLite).
+
+    Sessões anônimas (só chaves internas do Flask, como _flashes) valem apenas
+    `anonymous_lifetime` segundos no servidor: bastam para o flash sobreviver ao redirect.
+    """
+
+    session_class = ServerSideSession
+
+    def __init__(self, backend, anonymous_lifetime=300):
+        self.backend = backend
+        self.anonymous_lifetime = anonymous_lifetime
+
+    @staticmethod
+    def is_anonymous(session):
+        return all(key.startswith('_') for key in session)
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            loaded = self.backend.load(sid)
+            if loaded is not None:
+                data, expires_at = loaded
+                return self.session_class(data, sid=sid, expires_at=expires_at)
+        # Id desconhecido ou ausente: nunca reaproveita o id enviado pelo cliente
+        return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+
+    def _lifetime_expiry(self, app, session):
+        expires = self.get_expiration_time(app, session)
+        if expires is not None:
+            return expires, expires.timestamp()
+        # Sessão de navegador: mantém no servidor pelo PERMANENT_SESSION_LIFETIME
+        return None, time.time() + app.permanent_session_lifetime.total_seconds()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.previous_sid:
+            self.backend.delete(session.previous_sid)
+            session.previous_sid = None
+
+        if not session:
+            if session.modified and not session.new:
+                self.backend.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        cookie_expires, expires_at = self._lifetime_expiry(app, session)
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        anonymous = self.is_anonymous(session)
+        if anonymous:
+            lifetime = min(lifetime, self.anonymous_lifetime)
+            expires_at = min(expires_at, time.time() + lifetime)
+        # Sem alterações, só renova a validade quando já passou da metade do tempo de vida:
+        # evita uma escrita no backend (e um Set-Cookie) a cada requisição
+        touch = (self.should_set_cookie(app, session)
+                 and session.expires_at - time.time() < lifetime / 2)
+        if session.modified or touch:
+            self.backend.save(session.sid, session, expires_at, anonymous=anonymous)
+            session.expires_at = expires_at
+            response.set_cookie(
+                name, session.sid,
+                expires=cookie_expires,
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
@@ -74,28 +74,24 @@
             }
 
             // Usa a URL passada do HTML através da variável global 'config'
+            // stream: true -> o servidor percorre todas as páginas e responde em NDJSON
             fetch(config.searchIssuesUrl, {
                 method: 'POST',
-                headers: {'Content-Type': 'application/json', 'Accept': 'application/json'},
-                body: JSON.stringify({ jql: jqlQuery })
+                headers: {'Content-Type': 'application/json', 'Accept': 'application/x-ndjson'},
+                body: JSON.stringify({ jql: jqlQuery, stream: true })
             })
-            .then(handleFetchResponse)
-            .then(result => {
-                if (result.ok) {
-                    const issues = result.data.issues;
-                    if (issues && issues.length > 0) {
-                        showStatus(searchStatusDiv, `Encontradas ${issues.length} issues.`, 'success');
-                        displaySearchResults(issues);
-                    } else {
-                        showStatus(searchStatusDiv, 'Nenhuma issue encontrada para esta consulta.', 'info');
-                    }
-                } else {
-                     let errMsg = `Erro ${result.status}: ${result.data.error || 'Erro desconhecido.'}`;
-                     if (result.data.details && result.data.details.includes("Error in the JQL Query")) {
-                          errMsg += " Verifique a sintaxe da sua consulta JQL.";
-                     }
-                    showStatus(searchStatusDiv, errMsg, 'error');
+            .then(response => {
+                // Erros antes do início do stream continuam vindo como JSON comum
+                if (!response.ok || !response.body) {
+                    return handleFetchResponse(response).then(result => {
+                        let errMsg = `Erro ${result.status}: ${result.data.error || 'Erro desconhecido.'}`;
+                        if (result.data.details && result.data.details.includes("Error in the JQL Query")) {
+                             errMsg += " Verifique a sintaxe da sua consulta JQL.";
+                        }
+                        showStatus(searchStatusDiv, errMsg, 'error');
+                    });
                 }
+                return consumeSearchStream(response);
             })
             .catch(error => {
                 console.error('Erro ao buscar issues:', error);
@@ -110,9 +106,52 @@
 
     // --- Funções Auxiliares ---
 
-    function displaySearchResults(issues) {
+    function consumeSearchStream(response) {
+        // Lê o NDJSON linha a linha e adiciona as issues à tabela conforme cada página chega
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let total = 0;
+        let received = 0;
+
+        function handleLine(line) {
+            if (!line.trim()) return;
+            const message = JSON.parse(line);
+            if (message.type === 'meta') {
+                total = message.total;
+            } else if (message.type === 'issues') {
+                received += message.issues.length;
+                appendSearchResults(message.issues);
+                showStatus(searchStatusDiv, `Carregando issues... ${received} de ${total}.`, 'info');
+            } else if (message.type === 'error') {
+                showStatus(searchStatusDiv, `Erro: ${message.error} (${received} de ${total} issues carregadas)`, 'error');
+            } else if (message.type === 'end') {
+                if (received > 0) {
+                    showStatus(searchStatusDiv, `Encontradas ${received} issues.`, 'success');
+                } else {
+                    showStatus(searchStatusDiv, 'Nenhuma issue encontrada para esta consulta.', 'info');
+                }
+            }
+        }
+
+        function pump() {
+            return reader.read().then(({ done, value }) => {
+                if (done) {
+                    handleLine(buffer);
+                    return;
+                }
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop(); // Última linha pode estar incompleta
+                lines.forEach(handleLine);
+                return pump();
+            });
+        }
+        return pump();
+    }
+
+    function appendSearchResults(issues) {
         if (!searchResultsTbody || !searchResultsTable) return; // Garante que os elementos existem
-        searchResultsTbody.innerHTML = '';
         issues.forEach(issue => {
             const row = searchResultsTbody.insertRow();
             const cellKey = row.insertCell();